@@ -0,0 +1,74 @@
+import numpy as np
+
+from assets import FLIPPED, FLIPPED_CLIPS, assets
+
+# Animations: name -> (sprite clip, ((frame, duration in ms), ...), loops).
+# Frames index into the sprite clip. Durations are wall time, so a clip plays
+# at the same speed whatever the simulation tick rate; these match the old
+# per-tick speeds at 60 Hz (0.15, 0.2 and 0.1 frames per tick).
+ANIMATIONS = {
+    "player_idle": ("player_idle", ((0, 1000),), True),
+    "player_walk": ("player_walk", ((0, 111), (1, 111), (2, 111)), True),
+    # Keeps the last jump frame until landing
+    "player_jump": ("player_jump", ((1, 1000),), True),
+    "player_attack": ("player_attack", ((0, 83), (1, 83), (2, 83)), False),
+    "enemy_walk": ("enemy_walk", ((0, 167), (1, 167), (2, 167)), True),
+}
+
+
+# ---------------- ANIMATION ----------------
+# One animation baked for a tick rate: frames[flipped, tick] is the atlas
+# frame id shown `tick` ticks after the animation started, with row 1 the
+# mirrored clip (the same frames when the clip has no mirrored copy). An
+# entity only keeps its tick, so animating any number of them is one table
+# lookup each, or one fancy index over a whole batch.
+class Animation:
+    def __init__(self, name, fps):
+        clip, keys, self.loops = ANIMATIONS[name]
+        assets.load_sprite_clips()
+        mirrored = clip + FLIPPED if clip in FLIPPED_CLIPS else clip
+        ids = np.array([assets.clip(clip), assets.clip(mirrored)], np.int32)
+
+        # Each key ends on the tick nearest its end time, and tick t shows the
+        # key whose span holds it
+        ends = np.rint(np.cumsum([duration for _, duration in keys]) * fps / 1000.0).astype(np.int64)
+        self.length = max(1, int(ends[-1]))
+        key = np.minimum(np.searchsorted(ends, np.arange(self.length), side="right"), len(keys) - 1)
+        self.frames = ids[:, np.array([frame for frame, _ in keys])[key]]
+        # Batches index the rows end to end, flat[flipped * length + tick],
+        # and single lookups use plain lists, which beat indexing NumPy arrays
+        self.flat = self.frames.ravel()
+        self.table = self.frames.tolist()
+
+    def done(self, tick):
+        # True once a one-shot animation has played through
+        return not self.loops and tick >= self.length
+
+    def advance(self, tick):
+        # The next tick; looping animations wrap so ticks stay small
+        tick += 1
+        return 0 if self.loops and tick == self.length else tick
+
+    def frame(self, tick, flipped=False):
+        if self.loops:
+            tick %= self.length
+        elif tick >= self.length:
+            tick = self.length - 1
+        return self.table[flipped][tick]
+
+
+# ---------------- ANIMATION LIBRARY ----------------
+class AnimationLibrary:
+    # Every entity of a kind shares one baked Animation per tick rate
+    def __init__(self):
+        self.baked = {}
+
+    def get(self, name, fps):
+        key = (name, fps)
+        animation = self.baked.get(key)
+        if animation is None:
+            animation = self.baked[key] = Animation(name, fps)
+        return animation
+
+
+animations = AnimationLibrary()
@@ -0,0 +1,201 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+FLIPPED = ":flipped"
+ATLAS_WIDTH = 1024
+PRELOAD_WORKERS = 4
+
+
+# ---------------- ASSET LOADING ----------------
+def convert_image(image, alpha=True):
+    # Only convert when a display surface exists, so the world also loads headless
+    if pygame.display.get_init() and pygame.display.get_surface() is not None:
+        image = image.convert_alpha() if alpha else image.convert()
+    return image
+
+
+def load_image(path, alpha=True):
+    return convert_image(pygame.image.load(os.path.join(ASSET_DIR, path)), alpha)
+
+
+def decode_image(path, size=None):
+    # Thread-safe part of loading: decode (and scale) without touching the display
+    image = pygame.image.load(os.path.join(ASSET_DIR, path))
+    return image if size is None else pygame.transform.scale(image, size)
+
+
+def bounds(mask):
+    # Smallest rect holding every set pixel of mask, relative to its top-left
+    rects = mask.get_bounding_rects()
+    return rects[0].unionall(rects[1:]) if rects else pygame.Rect(0, 0, 0, 0)
+
+
+# Animation clips: name -> frame image paths. Clips listed in FLIPPED_CLIPS
+# also get a mirrored copy registered as name + FLIPPED.
+SPRITE_CLIPS = {
+    "player_idle": ["player/player_Idle.png"],
+    "player_walk": ["player/player_Walk1.png", "player/player_Walk2.png", "player/player_Walk3.png"],
+    "player_jump": ["player/player_Jump1.png", "player/player_Jump2.png"],
+    "player_attack": ["player/player_Attack1.png", "player/player_Attack2.png", "player/player_Attack3.png"],
+    "enemy_walk": ["enemies/enemy_Walk1.png", "enemies/enemy_Walk2.png", "enemies/enemy_Walk3.png"],
+    "key": ["interactibles/key_Collectible.png"],
+    "gate": ["interactibles/victory_Gate.png"],
+}
+FLIPPED_CLIPS = ("player_walk", "player_attack", "enemy_walk")
+
+
+# ---------------- ASSET MANAGER ----------------
+# Decodes every image once and packs all sprite frames into a single atlas.
+# Sprites hold integer frame ids and look their surface up in `frames`,
+# so spawning or animating never touches the disk or allocates a surface.
+class AssetManager:
+    def __init__(self):
+        self.images = {}
+        self.frames = []
+        self.frame_names = {}
+        self.clips = {}
+        self.solids = {}
+        # image cache key -> future of a decode running on the preload pool
+        self.pending = {}
+        self.atlas = None
+        self.dirty = False
+        self.masks = []
+        self.hitboxes = []
+
+    def image(self, path, alpha=True):
+        key = (path, alpha)
+        image = self.images.get(key)
+        if image is None:
+            image = self.take_preloaded(key, alpha)
+            if image is None:
+                image = load_image(path, alpha)
+            self.images[key] = image
+        return image
+
+    def scaled(self, path, size, alpha=True):
+        key = (path, alpha, size)
+        image = self.images.get(key)
+        if image is None:
+            image = self.take_preloaded(key, alpha)
+            if image is None:
+                image = pygame.transform.scale(self.image(path, alpha), size)
+            self.images[key] = image
+        return image
+
+    def tile(self, path, area, alpha=True):
+        # A region of an image, cached on its own so the full image is never kept
+        key = (path, alpha, tuple(area))
+        image = self.images.get(key)
+        if image is None:
+            source = self.images.get((path, alpha))
+            if source is None:
+                source = self.take_preloaded((path, alpha), alpha)
+            if source is None:
+                source = load_image(path, alpha)
+            image = self.images[key] = source.subsurface(area).copy()
+        return image
+
+    # ---------------- PRELOADING ----------------
+    def preload(self, requests, workers=PRELOAD_WORKERS):
+        # Starts decoding (path, alpha, size or None) requests on a thread pool and
+        # returns at once. image() / scaled() collect the results on the main
+        # thread, which is the only place surfaces get converted.
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preload")
+        for path, alpha, size in requests:
+            key = (path, alpha) if size is None else (path, alpha, size)
+            if key not in self.images and key not in self.pending:
+                self.pending[key] = executor.submit(decode_image, path, size)
+        executor.shutdown(wait=False)
+
+    def take_preloaded(self, key, alpha):
+        # Waits for a pending decode, if there is one; decode errors surface here
+        future = self.pending.pop(key, None)
+        if future is None:
+            return None
+        return convert_image(future.result(), alpha)
+
+    def solid(self, size, color):
+        # One shared plain surface per (size, color) for flashes and fades;
+        # users set its alpha right before blitting it
+        key = (size, tuple(color))
+        surface = self.solids.get(key)
+        if surface is None:
+            surface = self.solids[key] = pygame.Surface(size)
+            surface.fill(color)
+        return surface
+
+    def add_frame(self, name, surface):
+        frame_id = self.frame_names.get(name)
+        if frame_id is None:
+            frame_id = self.frame_names[name] = len(self.frames)
+            self.frames.append(surface)
+            self.dirty = True
+        return frame_id
+
+    def add_clip(self, name, surfaces, flipped=False):
+        self.clips[name] = tuple(self.add_frame(f"{name}{i}", surface) for i, surface in enumerate(surfaces))
+        if flipped:
+            self.clips[name + FLIPPED] = tuple(
+                self.add_frame(f"{name}{i}{FLIPPED}", pygame.transform.flip(surface, True, False))
+                for i, surface in enumerate(surfaces)
+            )
+        return self.clips[name]
+
+    def clip(self, name):
+        if self.dirty:
+            self.build_atlas()
+        return self.clips[name]
+
+    def load_sprite_clips(self):
+        if self.clips:
+            return
+        for name, paths in SPRITE_CLIPS.items():
+            try:
+                surfaces = [self.image(path) for path in paths]
+            except Exception as e:
+                if name != "key":
+                    raise
+                print("Error loading collectible image:", e)
+                # fallback: yellow square
+                fallback = pygame.Surface((20, 20))
+                fallback.fill((255, 255, 0))
+                surfaces = [fallback]
+            self.add_clip(name, surfaces, flipped=name in FLIPPED_CLIPS)
+        self.build_atlas()
+
+    def build_atlas(self):
+        # Shelf packing: tallest frames first, rows filled left to right
+        order = sorted(range(len(self.frames)), key=lambda i: self.frames[i].get_height(), reverse=True)
+        placements = {}
+        x = y = shelf_height = 0
+        for i in order:
+            w, h = self.frames[i].get_size()
+            if x + w > ATLAS_WIDTH:
+                x = 0
+                y += shelf_height
+                shelf_height = 0
+            placements[i] = pygame.Rect(x, y, w, h)
+            x += w
+            shelf_height = max(shelf_height, h)
+
+        atlas = pygame.Surface((ATLAS_WIDTH, max(1, y + shelf_height)), pygame.SRCALPHA)
+        if pygame.display.get_init() and pygame.display.get_surface() is not None:
+            atlas = atlas.convert_alpha()
+        atlas.fill((0, 0, 0, 0))
+        for i, rect in placements.items():
+            atlas.blit(self.frames[i], rect, special_flags=pygame.BLEND_RGBA_MAX)
+        self.frames = [atlas.subsurface(placements[i]) for i in range(len(self.frames))]
+        self.atlas = atlas
+        self.dirty = False
+
+        # Collision masks and opaque bounds per frame id, flipped frames included,
+        # so collision never builds a mask while the game runs
+        self.masks = [pygame.mask.from_surface(frame) for frame in self.frames]
+        self.hitboxes = [bounds(mask) for mask in self.masks]
+
+
+assets = AssetManager()
@@ -0,0 +1,109 @@
+import os
+
+import pygame
+
+from assets import ASSET_DIR
+
+# Small mixer buffer so effects start within a frame or two of their event
+MIXER_SETTINGS = (44100, -16, 2, 512)
+
+MUSIC = "sounds/music.ogg"
+MUSIC_VOLUME = 0.5
+
+# World event -> effect file. Every effect is decoded once, up front.
+SFX = {
+    "jump": "sounds/jump.wav",
+    "attack": "sounds/attack.wav",
+    "hit": "sounds/hit.wav",
+    "key": "sounds/key.wav",
+    "gate": "sounds/gate.wav",
+}
+SFX_VOLUME = 0.7
+# Channels reserved for effects; pygame never hands these out on its own
+SFX_CHANNELS = 6
+
+
+# ---------------- AUDIO ----------------
+# Music streams from disk through pygame.mixer.music. Effects play on a fixed
+# pool of reserved channels: a free channel if there is one, otherwise the one
+# whose effect started longest ago is cut off (voice stealing). Nothing here
+# waits on the device, and without a working mixer (or with files missing)
+# the calls turn into no-ops, so headless runs and asset-less checkouts work.
+class Audio:
+    def __init__(self, channels=SFX_CHANNELS):
+        self.enabled = pygame.mixer.get_init() is not None
+        if not self.enabled:
+            try:
+                pygame.mixer.init(*MIXER_SETTINGS)
+                self.enabled = True
+            except pygame.error as e:
+                print("Warning: no audio device - playing silently. Error:", e)
+
+        self.sounds = {}
+        self.channels = []
+        # Frame each pool channel last started on, to find the oldest voice
+        self.started = []
+        self.frame = 0
+        # Effects requested since the last update(), at most one of each per frame
+        self.queued = []
+        self.voices = 0
+        if not self.enabled:
+            return
+
+        if pygame.mixer.get_num_channels() < channels:
+            pygame.mixer.set_num_channels(channels)
+        pygame.mixer.set_reserved(channels)
+        self.channels = [pygame.mixer.Channel(i) for i in range(channels)]
+        self.started = [0] * channels
+
+        for name, path in SFX.items():
+            full_path = os.path.join(ASSET_DIR, path)
+            if not os.path.exists(full_path):
+                continue
+            try:
+                sound = pygame.mixer.Sound(full_path)
+            except pygame.error as e:
+                print("Error loading sound:", path, e)
+                continue
+            sound.set_volume(SFX_VOLUME)
+            self.sounds[name] = sound
+
+    # ---------------- MUSIC ----------------
+    def play_music(self, path=MUSIC, loops=-1):
+        full_path = os.path.join(ASSET_DIR, path)
+        if not self.enabled or not os.path.exists(full_path):
+            return
+        try:
+            pygame.mixer.music.load(full_path)
+        except pygame.error as e:
+            print("Error loading music:", path, e)
+            return
+        pygame.mixer.music.set_volume(MUSIC_VOLUME)
+        pygame.mixer.music.play(loops)
+
+    # ---------------- EFFECTS ----------------
+    def queue(self, events):
+        for name in events:
+            if name in self.sounds and name not in self.queued:
+                self.queued.append(name)
+
+    def play(self, name):
+        sound = self.sounds.get(name)
+        if sound is None:
+            return
+        channels = self.channels
+        for i, channel in enumerate(channels):
+            if not channel.get_busy():
+                break
+        else:
+            i = self.started.index(min(self.started))
+        channels[i].play(sound)
+        self.started[i] = self.frame
+
+    def update(self):
+        # Once per frame: start the queued effects and count the busy voices
+        self.frame += 1
+        for name in self.queued:
+            self.play(name)
+        self.queued.clear()
+        self.voices = sum(1 for channel in self.channels if channel.get_busy())
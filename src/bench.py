@@ -0,0 +1,215 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from level import Level
+from particles import ParticleSystem
+from render import WorldRenderer
+from world import HEIGHT, WIDTH, Inputs, World
+
+ENEMY_SCALES = (10, 100, 1000)
+PLATFORM_SCALES = (10, 1000, 10000)
+PARTICLE_SCALES = (100, 10000)
+
+WALK_RIGHT = Inputs(right=True)
+
+
+# ---------------- SYNTHETIC LEVELS ----------------
+def make_level(platforms=10, enemies=10, keys=5, crowd=False):
+    # Platforms fill six rows left to right; enemies stand on the ground.
+    # crowd=True packs every enemy into the first screen so nothing is culled.
+    columns = -(-platforms // 6)
+    width = max(3000, columns * 160 + WIDTH)
+    platform_data = [(0, 440, width, 40)]
+    for i in range(platforms - 1):
+        platform_data.append((200 + (i // 6) * 160, 100 + (i % 6) * 50, 120, 40))
+    spacing = WIDTH / enemies if crowd else (width - 400) / enemies
+    enemy_data = [(200 + int(i * spacing), 360, 80, 2) for i in range(enemies)]
+    key_data = [(300 + i * 400, 200) for i in range(keys)]
+    return Level(width, HEIGHT, (100, 300), (width - 200, 360), platform_data, enemy_data, key_data)
+
+
+# ---------------- TIMING ----------------
+def measure(fn, setup=None, number=100, repeat=7):
+    # Median and best time per call in microseconds; setup runs untimed before each sample
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number * 1e6)
+    return {"median_us": statistics.median(samples), "min_us": min(samples), "number": number, "repeat": repeat}
+
+
+# ---------------- BENCHMARKS ----------------
+def bench_player_update(scale, quick):
+    world = World(seed=0, level=make_level(platforms=scale))
+    player = world.player
+
+    def setup():
+        world.reset()
+        player.rect.topleft = (100, 400 - player.rect.height)
+
+    return measure(lambda: player.update(world.platform_index, WALK_RIGHT), setup,
+                   number=100 if quick else 500)
+
+
+def bench_enemy_update(scale, quick):
+    world = World(seed=0, level=make_level(enemies=scale))
+    return measure(world.update_enemies, world.reset, number=20 if quick else 100)
+
+
+def bench_enemy_chase(scale, quick):
+    # The whole crowd chases a player standing on the ground, timed once it has landed
+    level = make_level(platforms=60, enemies=scale, crowd=True)
+    level.chase = True
+    world = World(seed=0, level=level)
+    player = world.player
+
+    def setup():
+        world.reset()
+        player.rect.midbottom = (WIDTH // 2, 440)
+        for _ in range(60):
+            world.update_enemies()
+
+    return measure(world.update_enemies, setup, number=20 if quick else 100)
+
+
+def bench_combat(scale, quick):
+    # Attack into a packed crowd; every sample starts from a fresh crowd
+    world = World(seed=0, level=make_level(enemies=scale, crowd=True))
+    player = world.player
+
+    def setup():
+        world.reset()
+        player.rect.midbottom = (WIDTH // 2, 440)
+        player.is_attacking = True
+
+    return measure(lambda: world.update_combat(), setup, number=1, repeat=15 if quick else 50)
+
+
+def bench_particles(scale, quick):
+    particles = ParticleSystem(capacity=scale, seed=0)
+
+    def setup():
+        particles.clear()
+        particles.emit(400, 240, scale)
+
+    # Fewer updates than the shortest particle life, so the live count stays at scale
+    return measure(particles.update, setup, number=10, repeat=5 if quick else 20)
+
+
+def bench_draw(scale, quick):
+    screen = pygame.display.get_surface()
+    world = World(seed=0, level=make_level(enemies=scale, crowd=True))
+    world.particles.emit(WIDTH // 2, 240, 100)
+    renderer = WorldRenderer(screen, world)
+    return measure(renderer.draw, number=10 if quick else 50)
+
+
+def bench_step(scale, quick):
+    world = World(seed=0, level=make_level(platforms=scale, enemies=scale // 10))
+    return measure(lambda: world.step(WALK_RIGHT), world.reset, number=100 if quick else 500)
+
+
+def bench_snapshot(scale, quick):
+    # Snapshot then restore, mid-run with some particles alive
+    world = World(seed=0, level=make_level(enemies=scale))
+
+    def setup():
+        world.reset()
+        world.particles.emit(400, 300, 200)
+        for _ in range(30):
+            world.step(WALK_RIGHT)
+
+    return measure(lambda: world.restore(world.snapshot()), setup, number=100 if quick else 500)
+
+
+BENCHMARKS = [
+    ("player_update", "platforms", PLATFORM_SCALES, bench_player_update),
+    ("enemy_update", "enemies", ENEMY_SCALES, bench_enemy_update),
+    ("enemy_chase", "enemies", ENEMY_SCALES, bench_enemy_chase),
+    ("combat", "enemies", ENEMY_SCALES, bench_combat),
+    ("particles", "particles", PARTICLE_SCALES, bench_particles),
+    ("draw", "enemies", ENEMY_SCALES, bench_draw),
+    ("step", "platforms", PLATFORM_SCALES, bench_step),
+    ("snapshot", "enemies", ENEMY_SCALES, bench_snapshot),
+]
+
+
+def run(names=None, quick=False):
+    results = {}
+    for name, unit, scales, fn in BENCHMARKS:
+        if names and name not in names:
+            continue
+        for scale in scales:
+            key = f"{name}/{unit}={scale}"
+            results[key] = fn(scale, quick)
+            print(f"{key:32s} {results[key]['median_us']:12.1f} us", file=sys.stderr)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(report, baseline, threshold):
+    # Prints current vs baseline and returns the keys that got slower than threshold
+    regressions = []
+    print(f"{'benchmark':32s} {'baseline us':>12s} {'current us':>12s} {'ratio':>7s}")
+    for key, result in report["results"].items():
+        base = baseline["results"].get(key)
+        if base is None:
+            print(f"{key:32s} {'-':>12s} {result['median_us']:12.1f} {'new':>7s}")
+            continue
+        ratio = result["median_us"] / base["median_us"] if base["median_us"] else float("inf")
+        flag = " !" if ratio > 1 + threshold else ""
+        print(f"{key:32s} {base['median_us']:12.1f} {result['median_us']:12.1f} {ratio:7.2f}{flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the update, collision and render hot paths")
+    parser.add_argument("names", nargs="*", help="only run these benchmarks")
+    parser.add_argument("--quick", action="store_true", help="fewer samples, for a fast sanity run")
+    parser.add_argument("--save", metavar="PATH", help="write the JSON report here")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a saved report")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown vs baseline (default 0.10)")
+    args = parser.parse_args()
+
+    pygame.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    report = run(args.names, args.quick)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) past {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
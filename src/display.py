@@ -0,0 +1,210 @@
+import pygame
+
+from assets import assets
+from render import HUD_POS, WorldRenderer
+
+# Texture cache entries nobody drew for this many frames are dropped, so
+# surfaces a streamed level rebakes don't pin their old textures
+TEXTURE_IDLE_FRAMES = 600
+
+
+# ---------------- SURFACE DISPLAY ----------------
+# The classic path: every frame is blitted in software onto the set_mode
+# surface and pushed with display.flip() / display.update().
+class SurfaceDisplay:
+    def __init__(self, size, caption):
+        self.size = size
+        self.surface = pygame.display.set_mode(size)
+        pygame.display.set_caption(caption)
+
+    def world_renderer(self, world):
+        return WorldRenderer(self.surface, world)
+
+    def blit(self, surface, pos):
+        # Draws a software surface over the current frame (profiler panel)
+        self.surface.blit(surface, pos)
+
+    def flip(self):
+        pygame.display.flip()
+
+    def show(self, rects, fade=None):
+        # Pushes the scene canvas; fade is (color, alpha) laid over all of it
+        if fade is not None:
+            color, alpha = fade
+            overlay = assets.solid(self.size, color)
+            overlay.set_alpha(alpha)
+            self.surface.blit(overlay, (0, 0))
+        pygame.display.update(rects)
+
+    def capture(self, out):
+        # Copies the frame just drawn into out
+        out.blit(self.surface, (0, 0))
+
+
+# ---------------- TEXTURE CACHE ----------------
+class TextureCache:
+    # Surface -> (texture, source rect), uploaded the first time the surface is
+    # drawn. Atlas frames are subsurfaces, so they all share the atlas texture.
+    def __init__(self, renderer):
+        from pygame._sdl2.video import Texture
+        self.renderer = renderer
+        self.texture_class = Texture
+        self.by_base = {}
+        self.entries = {}
+        self.frame = 0
+
+    def lookup(self, surface):
+        key = id(surface)
+        entry = self.entries.get(key)
+        if entry is None:
+            base = surface.get_abs_parent()
+            texture = self.base_texture(base)
+            area = pygame.Rect(surface.get_abs_offset(), surface.get_size())
+            # The surface is kept in the entry so its id can't be reused while cached
+            entry = self.entries[key] = [texture, area, surface, self.frame]
+        entry[3] = self.frame
+        return entry[0], entry[1]
+
+    def base_texture(self, base):
+        key = id(base)
+        entry = self.by_base.get(key)
+        if entry is None:
+            texture = self.texture_class.from_surface(self.renderer, base)
+            if base.get_alpha() is not None and not base.get_flags() & pygame.SRCALPHA:
+                texture.alpha = base.get_alpha()
+            entry = self.by_base[key] = (texture, base)
+        return entry[0]
+
+    def upload(self, surface):
+        # Refreshes the texture of a surface whose pixels changed
+        entry = self.by_base.get(id(surface))
+        if entry is not None:
+            entry[0].update(surface)
+
+    def end_frame(self):
+        self.frame += 1
+        if self.frame % TEXTURE_IDLE_FRAMES:
+            return
+        oldest = self.frame - TEXTURE_IDLE_FRAMES
+        self.entries = {key: entry for key, entry in self.entries.items() if entry[3] >= oldest}
+        used = {id(entry[2].get_abs_parent()) for entry in self.entries.values()}
+        self.by_base = {key: entry for key, entry in self.by_base.items() if key in used}
+
+
+# ---------------- TEXTURE DISPLAY ----------------
+# Draws through pygame._sdl2.video instead: sprites are uploaded once as
+# textures and copied by the renderer, screen shake is a viewport offset and
+# the red flash / fades are a blended fill_rect, so no frame blends pixels in
+# software. software=True asks SDL for its software renderer, which runs
+# anywhere, GPU or not. Scenes still draw on a canvas surface, which is
+# uploaded when they present.
+class TextureDisplay:
+    def __init__(self, size, caption, software=False, vsync=False):
+        from pygame._sdl2.video import Renderer, Texture, Window
+        self.size = size
+        self.window = Window(caption, size)
+        self.renderer = Renderer(self.window, accelerated=0 if software else -1, vsync=vsync)
+        self.textures = TextureCache(self.renderer)
+        self.surface = pygame.Surface(size)
+        self.canvas = Texture(self.renderer, size, streaming=True)
+
+    def world_renderer(self, world):
+        return TextureWorldRenderer(self, world)
+
+    def fill(self, color, alpha, rect=None):
+        renderer = self.renderer
+        renderer.draw_blend_mode = pygame.BLENDMODE_BLEND
+        renderer.draw_color = (*color, alpha)
+        renderer.fill_rect(rect or pygame.Rect((0, 0), self.size))
+        renderer.draw_blend_mode = pygame.BLENDMODE_NONE
+
+    def blit(self, surface, pos):
+        # Surfaces drawn here change every frame, so they get a throwaway texture
+        texture = self.textures.texture_class.from_surface(self.renderer, surface)
+        texture.draw(None, pygame.Rect(pos, surface.get_size()))
+
+    def flip(self):
+        self.renderer.present()
+        self.textures.end_frame()
+
+    def show(self, rects, fade=None):
+        self.canvas.update(self.surface)
+        self.canvas.draw()
+        if fade is not None:
+            color, alpha = fade
+            self.fill(color, alpha)
+        self.renderer.present()
+
+    def capture(self, out):
+        self.renderer.to_surface(out)
+
+
+# ---------------- TEXTURE WORLD RENDERER ----------------
+class TextureWorldRenderer(WorldRenderer):
+    # Same frame as WorldRenderer, drawn with textures on a TextureDisplay
+    def __init__(self, display, world):
+        super().__init__(display.surface, world)
+        self.display = display
+        self.renderer = display.renderer
+        self.textures = display.textures
+
+    def draw_parallax(self, layer, camera_x, camera_y, offset_x, offset_y):
+        # Tiles are laid out for the steady camera and the shake moves the
+        # viewport, by exactly what the shaken camera would have scrolled the
+        # layer. Drawing is clipped to the viewport, so it reaches as far past
+        # the window edges as it is shifted, and the tiles cover all of it.
+        renderer = self.renderer
+        width, height = self.display.size
+        texture, area = self.textures.lookup(layer.tile)
+        tile_width, tile_height = area.size
+        shift_x = int(offset_x * layer.factor) - int(camera_x * layer.factor)
+        shift_y = int(offset_y) - int(camera_y)
+        margin_x = abs(shift_x)
+        margin_y = abs(shift_y)
+        start_x = margin_x - int(offset_x * layer.factor) % tile_width
+        if start_x > 0:
+            start_x -= tile_width
+        start_y = margin_y - int(offset_y) % tile_height
+        if start_y > 0:
+            start_y -= tile_height
+        renderer.set_viewport(pygame.Rect(shift_x - margin_x, shift_y - margin_y,
+                                          width + 2 * margin_x, height + 2 * margin_y))
+        count = 0
+        for x in range(start_x, width + 2 * margin_x, tile_width):
+            for y in range(start_y, height + 2 * margin_y, tile_height):
+                texture.draw(area, (x, y, tile_width, tile_height))
+                count += 1
+        renderer.set_viewport(None)
+        return count
+
+    def draw(self, alpha=1.0):
+        world = self.world
+        display = self.display
+        renderer = self.renderer
+        lookup = self.textures.lookup
+        camera_x, camera_y, offset_x, offset_y = self.submit_frame(alpha)
+
+        renderer.draw_color = (0, 0, 0, 255)
+        renderer.clear()
+        blits = 0
+        for layer in self.parallax:
+            blits += self.draw_parallax(layer, camera_x, camera_y, offset_x, offset_y)
+
+        for surfaces, screen_x, screen_y in self.queue.drain(offset_x, offset_y):
+            for surface, x, y in zip(surfaces, screen_x, screen_y):
+                texture, area = lookup(surface)
+                texture.draw(area, (x, y, area.width, area.height))
+            blits += len(surfaces)
+
+        if world.red_flash_alpha > 0:
+            display.fill((255, 0, 0), int(world.red_flash_alpha))
+            blits += 1
+
+        hud = self.hud
+        redrawn = hud.refresh(world.player.health, world.collected_count)
+        texture, area = lookup(hud.surface)
+        if redrawn:
+            self.textures.upload(hud.surface)
+        texture.draw(area, pygame.Rect(HUD_POS, area.size))
+        self.blits = blits + 1
+        self.surfaces = 1 if redrawn else 0
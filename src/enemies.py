@@ -0,0 +1,405 @@
+import numpy as np
+
+from animation import animations
+from assets import assets
+
+# Level art places skeletons this far into the platform they stand on
+ENEMY_SINK = 40
+# Patrolling enemies this close to the player start chasing (when enabled)
+CHASE_RANGE = 320
+# Up to this many rows, a plain loop over lists beats the fixed cost of the
+# NumPy calls, which is what dominates a small level's tick
+SMALL_BATCH = 16
+
+# A patrolling enemy taken out of the batch while it is far from the player:
+# its row, left / right bounding every x its sprite can cover on that patrol,
+# and the tick it fell asleep. Sleepers are kept in arrays of this dtype,
+# which is also how snapshots store them.
+SLEEPER = np.dtype([("spawn_id", "<i8"), ("x", "<i8"), ("y", "<i8"), ("start_x", "<f8"),
+                    ("patrol_width", "<f8"), ("speed", "<f8"), ("direction", "<i8"), ("anim", "<i8"),
+                    ("left", "<f8"), ("right", "<f8"), ("tick", "<u4")])
+# The SLEEPER fields copied straight from batch rows
+SLEEPER_ROW_FIELDS = ("spawn_id", "x", "y", "start_x", "patrol_width", "speed", "direction", "anim")
+
+
+def patrol_after(x, direction, start_x, patrol_width, step, ticks):
+    # Closed form of `ticks` patrol steps of `step` pixels. A patrol starting
+    # on start_x only visits start_x + j * step for j in [-1, k], where
+    # k = floor(patrol_width / step) + 1, turning at both ends, so it is a
+    # cycle of 2 * (k + 1) phases: phase p <= k walks right at j = p - 1,
+    # the rest walk left at j = 2k + 1 - p.
+    k = np.floor(patrol_width / step).astype(np.int64) + 1
+    j = np.rint((x - start_x) / step).astype(np.int64)
+    phase = np.where(direction == 1, j + 1, 2 * k + 1 - j)
+    phase = (phase + ticks) % (2 * (k + 1))
+    right = phase <= k
+    j = np.where(right, phase - 1, 2 * k + 1 - phase)
+    return np.rint(start_x + j * step).astype(np.int64), np.where(right, 1, -1)
+
+
+# ---------------- ENEMY BATCH ----------------
+# Every skeleton is a row in a set of NumPy arrays instead of a Sprite, so
+# patrol movement, direction flips, animation and the death fall advance for
+# all of them in one vectorized step. Rows are kept packed in [0, count);
+# removing enemies moves rows from the tail into the holes, so a row index is
+# only stable for the current tick. spawn_id is the lasting identity.
+class EnemyBatch:
+    def __init__(self, fps, capacity=64):
+        assets.load_sprite_clips()
+        self.frames = assets.frames
+        # anim is the tick into this animation. The walk art faces left, so
+        # moving right uses the flipped row.
+        self.walk = animations.get("enemy_walk", fps)
+        self.width, self.height = self.frames[self.walk.table[0][0]].get_size()
+        # Per frame id: collision mask and the opaque bounds it sits in
+        self.masks = assets.masks
+        self.hitboxes = assets.hitboxes
+
+        self.count = 0
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        old = self.count
+        self.capacity = capacity
+
+        def grow(name, dtype):
+            array = np.zeros(capacity, dtype)
+            if old:
+                array[:old] = getattr(self, name)[:old]
+            setattr(self, name, array)
+
+        grow("x", np.int64)
+        grow("y", np.int64)
+        grow("start_x", np.float64)
+        grow("patrol_width", np.float64)
+        grow("speed", np.float64)
+        grow("direction", np.int64)
+        grow("anim", np.int64)
+        grow("dead_anim", np.int64)
+        grow("frame_id", np.int32)
+        grow("spawn_id", np.int64)
+        # Chasing enemies follow the nav graph instead of their patrol.
+        # node is the platform they stand on, -1 while airborne.
+        grow("chasing", np.bool_)
+        grow("node", np.int64)
+        grow("vel_y", np.float64)
+        grow("air_x", np.float64)
+        # Position at the start of the tick, for render interpolation
+        grow("prev_x", np.int64)
+        grow("prev_y", np.int64)
+        self.arrays = (self.x, self.y, self.start_x, self.patrol_width, self.speed, self.direction,
+                       self.anim, self.dead_anim, self.frame_id, self.spawn_id,
+                       self.chasing, self.node, self.vel_y, self.air_x, self.prev_x, self.prev_y)
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def add(self, spawn_id, x, y, patrol_width=100, speed=2):
+        if self.count == self.capacity:
+            self.allocate(self.capacity * 2)
+        i = self.count
+        self.x[i] = self.prev_x[i] = x
+        self.y[i] = self.prev_y[i] = y
+        self.start_x[i] = x
+        self.patrol_width[i] = patrol_width
+        self.speed[i] = speed
+        self.direction[i] = 1
+        self.anim[i] = 0
+        self.dead_anim[i] = 0
+        self.frame_id[i] = self.walk.table[0][0]
+        self.spawn_id[i] = spawn_id
+        self.chasing[i] = False
+        self.node[i] = -1
+        self.vel_y[i] = 0
+        self.count += 1
+        return i
+
+    def remove(self, rows):
+        # Swap-compaction: live rows past the new end fill the removed ones
+        n = self.count
+        keep = np.ones(n, bool)
+        keep[rows] = False
+        live = int(np.count_nonzero(keep))
+        if live == n:
+            return
+        holes = np.flatnonzero(~keep[:live])
+        movers = np.flatnonzero(keep[live:]) + live
+        for array in self.arrays:
+            array[holes] = array[movers]
+        self.count = live
+
+    # ---------------- SNAPSHOT ----------------
+    def pack(self):
+        # Every live row of every array, array by array
+        n = self.count
+        return b"".join(array[:n].tobytes() for array in self.arrays)
+
+    def unpack(self, data, offset, count):
+        # Replaces all rows with count rows packed at data[offset:]; returns the end offset
+        if count > self.capacity:
+            self.count = 0
+            self.allocate(max(count, self.capacity * 2))
+        for array in self.arrays:
+            array[:count] = np.frombuffer(data, array.dtype, count, offset)
+            offset += count * array.itemsize
+        self.count = count
+        return offset
+
+    def remove_spawns(self, spawn_ids):
+        if self.count and len(spawn_ids):
+            self.remove(np.flatnonzero(np.isin(self.spawn_id[:self.count], spawn_ids)))
+
+    # ---------------- SLEEP ----------------
+    def sleepy(self, left, right):
+        # Patrolling rows whose whole patrol lies outside [left, right). Only
+        # rows whose x moves by the same whole number of pixels every tick
+        # qualify, so that patrol_after() reproduces their patrol exactly.
+        n = self.count
+        speed = self.speed[:n]
+        step = np.rint(speed)
+        start_x = self.start_x[:n]
+        span_left = start_x - step
+        span_right = start_x + self.patrol_width[:n] + step + self.width
+        return np.flatnonzero(~self.chasing[:n] & (self.dead_anim[:n] == 0) & (step > 0)
+                              & (np.abs(speed - step) != 0.5) & ((span_right <= left) | (span_left >= right)))
+
+    def sleep(self, rows, tick):
+        # Removes rows from the batch and returns them as a SLEEPER array
+        sleepers = np.empty(len(rows), SLEEPER)
+        for name in SLEEPER_ROW_FIELDS:
+            sleepers[name] = getattr(self, name)[rows]
+        step = np.rint(self.speed[rows])
+        sleepers["left"] = self.start_x[rows] - step
+        sleepers["right"] = self.start_x[rows] + self.patrol_width[rows] + step + self.width
+        sleepers["tick"] = tick
+        self.remove(rows)
+        return sleepers
+
+    def wake(self, sleepers, tick):
+        # Adds a SLEEPER array back at tick, with each patrol and animation
+        # fast-forwarded to where ticking would have left them
+        k = len(sleepers)
+        if k == 0:
+            return
+        spawn_id, y, start_x, patrol_width, speed, anim = (
+            sleepers[name] for name in ("spawn_id", "y", "start_x", "patrol_width", "speed", "anim"))
+        elapsed = tick - sleepers["tick"].astype(np.int64)
+        x, direction = patrol_after(sleepers["x"], sleepers["direction"], start_x, patrol_width, np.rint(speed), elapsed)
+        anim = (anim + elapsed) % self.walk.length
+        frame_id = self.walk.flat[(direction == 1) * self.walk.length + anim]
+
+        n = self.count
+        while n + k > self.capacity:
+            self.allocate(self.capacity * 2)
+        rows = slice(n, n + k)
+        self.x[rows] = self.prev_x[rows] = x
+        self.y[rows] = self.prev_y[rows] = y
+        self.start_x[rows] = start_x
+        self.patrol_width[rows] = patrol_width
+        self.speed[rows] = speed
+        self.direction[rows] = direction
+        self.anim[rows] = anim
+        self.dead_anim[rows] = 0
+        self.frame_id[rows] = frame_id
+        self.spawn_id[rows] = spawn_id
+        self.chasing[rows] = False
+        self.node[rows] = -1
+        self.vel_y[rows] = 0
+        self.air_x[rows] = 0
+        self.count = n + k
+
+    # ---------------- UPDATE ----------------
+    def save_previous(self):
+        n = self.count
+        self.prev_x[:n] = self.x[:n]
+        self.prev_y[:n] = self.y[:n]
+
+    def interpolated(self, rows, alpha):
+        # Positions of rows blended between the last two ticks
+        x = self.x[rows]
+        y = self.y[rows]
+        if alpha >= 1.0:
+            return x, y
+        prev_x = self.prev_x[rows]
+        prev_y = self.prev_y[rows]
+        return np.rint(prev_x + (x - prev_x) * alpha).astype(np.int64), np.rint(prev_y + (y - prev_y) * alpha).astype(np.int64)
+
+    def update(self):
+        n = self.count
+        if n == 0:
+            return
+        if n <= SMALL_BATCH and not self.dead_anim[:n].any() and not self.chasing[:n].any():
+            self.update_patrol(n)
+            return
+        dead_anim = self.dead_anim[:n]
+        falling = dead_anim > 0
+        if falling.any():
+            dead_anim[falling] -= 1
+            self.y[:n][falling] += 2
+            walking = np.flatnonzero(~falling)
+        else:
+            walking = slice(None)
+
+        # Patrol movement; chasers are moved by chase() instead
+        x = self.x[:n]
+        direction = self.direction[:n]
+        start_x = self.start_x[:n]
+        chasing = self.chasing[:n]
+        if isinstance(walking, slice) and not chasing.any():
+            patrol = walking
+        else:
+            patrol = ~(chasing | falling)
+        x[patrol] = np.rint(x[patrol] + self.speed[:n][patrol] * direction[patrol])
+        turn = (x > start_x + self.patrol_width[:n]) | (x < start_x)
+        if patrol is not walking:
+            turn &= patrol
+        direction[turn] *= -1
+
+        # Animate: one table lookup per enemy, in the row for its facing
+        anim = self.anim[:n]
+        anim[walking] += 1
+        anim[anim == self.walk.length] = 0
+        self.frame_id[:n][walking] = self.walk.flat[(direction[walking] == 1) * self.walk.length + anim[walking]]
+
+    def update_patrol(self, n):
+        # update() for a few rows that all patrol, one row at a time in Python;
+        # round() rounds half to even like np.rint, so both paths agree
+        xs = self.x[:n].tolist()
+        directions = self.direction[:n].tolist()
+        anims = self.anim[:n].tolist()
+        length = self.walk.length
+        table = self.walk.table
+        frame_ids = []
+        for i, (start_x, patrol_width, speed) in enumerate(zip(
+                self.start_x[:n].tolist(), self.patrol_width[:n].tolist(), self.speed[:n].tolist())):
+            direction = directions[i]
+            x = xs[i] = round(xs[i] + speed * direction)
+            if x > start_x + patrol_width or x < start_x:
+                direction = directions[i] = -direction
+            anim = anims[i] + 1
+            if anim == length:
+                anim = 0
+            anims[i] = anim
+            frame_ids.append(table[direction == 1][anim])
+        self.x[:n] = xs
+        self.direction[:n] = directions
+        self.anim[:n] = anims
+        self.frame_id[:n] = frame_ids
+
+    # ---------------- CHASE ----------------
+    def aggro(self, nav, player_rect):
+        # Patrolling enemies near the player switch to chasing for good
+        n = self.count
+        cx = self.x[:n] + self.width // 2
+        cy = self.y[:n] + self.height // 2
+        near = (~self.chasing[:n] & (self.dead_anim[:n] == 0)
+                & (np.abs(cx - player_rect.centerx) < CHASE_RANGE) & (np.abs(cy - player_rect.centery) < CHASE_RANGE))
+        foot = self.height - ENEMY_SINK
+        for row in np.flatnonzero(near).tolist():
+            x = int(self.x[row])
+            node = nav.node_at(x, x + self.width, int(self.y[row]) + foot)
+            self.node[row] = -1 if node is None else node
+            self.vel_y[row] = 0
+            self.air_x[row] = x + self.width // 2
+        self.chasing[:n] |= near
+
+    def chase(self, nav, target_x, level_width):
+        # Moves every chasing enemy one tick along the cached path to the
+        # player's platform. Standing enemies steer with one nav lookup per
+        # distinct platform; airborne ones fall under gravity until they land.
+        n = self.count
+        rows = np.flatnonzero(self.chasing[:n] & (self.dead_anim[:n] == 0))
+        if rows.size == 0:
+            return
+        half = self.width // 2
+        foot = self.height - ENEMY_SINK
+        standing = self.node[rows] >= 0
+        grounded = rows[standing]
+        airborne = rows[~standing]
+
+        if grounded.size:
+            nodes = self.node[grounded]
+            unique, inverse = np.unique(nodes, return_inverse=True)
+            steer = [nav.steer(node, target_x) for node in unique.tolist()]
+            head_x = np.array([s[0] for s in steer], np.float64)[inverse]
+            jump = np.array([s[1] for s in steer], np.bool_)[inverse]
+            land_x = np.array([s[2] for s in steer], np.float64)[inverse]
+
+            speed = self.speed[grounded]
+            cx = self.x[grounded] + half
+            dx = np.clip(head_x - cx, -speed, speed)
+            self.x[grounded] = np.rint(self.x[grounded] + dx)
+            moving = dx != 0
+            self.direction[grounded[moving]] = np.sign(dx[moving]).astype(np.int64)
+
+            # Take off at the jump point, or drop when walking past the edge
+            cx = self.x[grounded] + half
+            launch = jump & (np.abs(head_x - cx) < 1)
+            off = ~launch & ((cx < nav.lefts[nodes]) | (cx >= nav.rights[nodes]))
+            leave = launch | off
+            if leave.any():
+                leaving = grounded[leave]
+                self.node[leaving] = -1
+                self.vel_y[leaving] = np.where(launch[leave], nav.jump_power, 0.0)
+                self.air_x[leaving] = np.where(launch[leave], land_x[leave], head_x[leave])
+
+        if airborne.size:
+            vel_y = self.vel_y[airborne] + nav.gravity
+            self.vel_y[airborne] = vel_y
+            prev_feet = self.y[airborne] + foot
+            self.y[airborne] = np.rint(self.y[airborne] + vel_y)
+            cx = self.x[airborne] + half
+            dx = np.clip(self.air_x[airborne] - cx, -nav.speed, nav.speed)
+            self.x[airborne] = np.rint(self.x[airborne] + dx)
+            moving = dx != 0
+            self.direction[airborne[moving]] = np.sign(dx[moving]).astype(np.int64)
+
+            # Landing is per enemy, but only enemies on the way down ask
+            feet = self.y[airborne] + foot
+            cx = (self.x[airborne] + half).tolist()
+            for i in np.flatnonzero(vel_y >= 0).tolist():
+                node = nav.landing(cx[i], int(prev_feet[i]), int(feet[i]))
+                if node is not None:
+                    row = airborne[i]
+                    self.node[row] = node
+                    self.vel_y[row] = 0
+                    self.y[row] = nav.rects[node].top - foot
+
+        self.x[rows] = np.clip(self.x[rows], 0, level_width - self.width)
+
+    # ---------------- QUERIES ----------------
+    def overlap(self, rect):
+        # Rows whose bounding box overlaps rect, as one vectorized AABB test
+        # (a plain loop for small batches)
+        n = self.count
+        if n <= SMALL_BATCH:
+            left, top, right, bottom = rect.left, rect.top, rect.right, rect.bottom
+            width = self.width
+            height = self.height
+            return np.array([row for row, (x, y) in enumerate(zip(self.x[:n].tolist(), self.y[:n].tolist()))
+                             if x < right and x + width > left and y < bottom and y + height > top], np.int64)
+        x = self.x[:n]
+        y = self.y[:n]
+        hit = (x < rect.right) & (x + self.width > rect.left) & (y < rect.bottom) & (y + self.height > rect.top)
+        return np.flatnonzero(hit)
+
+    def collide(self, mask, x, y, box):
+        # Rows whose opaque pixels touch mask placed at (x, y); box bounds the
+        # mask's set pixels in world space. A vectorized frame-box test, then
+        # each row's opaque bounds, leave only a few rows for Mask.overlap.
+        rows = self.overlap(box)
+        if rows.size == 0:
+            return rows
+        masks = self.masks
+        hitboxes = self.hitboxes
+        touching = []
+        for row, fid, rx, ry in zip(rows.tolist(), self.frame_id[rows].tolist(), self.x[rows].tolist(), self.y[rows].tolist()):
+            if box.colliderect(hitboxes[fid].move(rx, ry)) and mask.overlap(masks[fid], (rx - x, ry - y)):
+                touching.append(row)
+        return np.array(touching, np.int64)
+
+    def centers(self, rows):
+        return self.x[rows] + self.width // 2, self.y[rows] + self.height // 2
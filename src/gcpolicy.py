@@ -0,0 +1,121 @@
+import gc
+import time
+import tracemalloc
+
+# "auto" leaves Python's collector alone and only measures it; "deferred"
+# switches automatic collection off and runs it where a pause can't be seen
+GC_MODES = ("auto", "deferred")
+
+# Young collections run in the idle part of a frame once this many objects
+# are pending (Python's own generation 0 threshold)
+YOUNG_THRESHOLD = 700
+# Every this many young collections, the middle generation is swept too
+MIDDLE_EVERY = 10
+# Past this many pending objects a collection runs even without idle time,
+# so a frame that never idles still can't grow the heap without bound
+FORCE_THRESHOLD = 50000
+# A collection only starts in idle time at least this multiple of what
+# recent young collections took
+IDLE_MARGIN = 2.0
+
+
+# ---------------- GC POLICY ----------------
+# Everything alive once a level is loaded (assets, level data, the world) is
+# moved out of the collector's reach with gc.freeze(), so a collection only
+# walks what was allocated since. In deferred mode collections then run at
+# scene transitions and in the time a frame has left before its deadline,
+# never in the middle of a step or draw.
+#
+# Every collection is timed through gc.callbacks, and per frame the policy
+# reports the net count of new GC-tracked objects (from the generation 0
+# counter, read before each collection resets it), the time spent paused and
+# the part of it that ran outside idle(), i.e. a possible hitch. trace=True
+# also samples tracemalloc for the bytes allocated in the frame, which is
+# exact but slows everything down noticeably.
+class GCPolicy:
+    def __init__(self, mode="deferred", trace=False):
+        self.mode = mode
+        self.trace = trace
+        self.scheduled = False
+        self.started = 0.0
+        self.young_collections = 0
+        # Recent worst young collection in seconds (decays so one slow outlier
+        # doesn't lock idle collections out); the first guess is 1 ms
+        self.young_cost = 0.001
+
+        # Totals since the last begin_frame()
+        self.pending_at = 0
+        self.allocs = 0
+        self.pause_us = 0
+        self.unplanned_us = 0
+        self.collections = 0
+        self.alloc_bytes = 0
+        self.traced_at = 0
+
+        if mode == "deferred":
+            gc.disable()
+        gc.callbacks.append(self.on_collect)
+        if trace:
+            tracemalloc.start()
+
+    def on_collect(self, phase, info):
+        if phase == "start":
+            self.allocs += max(0, gc.get_count()[0] - self.pending_at)
+            self.started = time.perf_counter()
+            return
+        elapsed = time.perf_counter() - self.started
+        self.pending_at = gc.get_count()[0]
+        self.pause_us += int(elapsed * 1e6)
+        self.collections += 1
+        if not self.scheduled:
+            self.unplanned_us += int(elapsed * 1e6)
+        elif info["generation"] == 0:
+            self.young_cost = max(elapsed, self.young_cost * 0.9)
+
+    def collect(self, generation=2):
+        self.scheduled = True
+        try:
+            gc.collect(generation)
+        finally:
+            self.scheduled = False
+
+    # ---------------- TRANSITIONS ----------------
+    def freeze(self):
+        # After a level load: sweep once, then park every survivor in the
+        # permanent generation
+        self.collect()
+        gc.freeze()
+        self.pending_at = gc.get_count()[0]
+
+    def transition(self):
+        # Scene changes hide a full collection of whatever isn't frozen
+        self.collect()
+
+    # ---------------- PER FRAME ----------------
+    def begin_frame(self):
+        self.pending_at = gc.get_count()[0]
+        self.allocs = 0
+        self.pause_us = 0
+        self.unplanned_us = 0
+        self.collections = 0
+        if self.trace:
+            tracemalloc.reset_peak()
+            self.traced_at = tracemalloc.get_traced_memory()[0]
+
+    def idle(self, deadline):
+        # Called when the frame's work is done and before it waits for
+        # deadline (a perf_counter() time); collects if it fits or must
+        if self.mode != "deferred":
+            return
+        pending = gc.get_count()[0]
+        if pending >= FORCE_THRESHOLD:
+            self.collect(0)
+        elif pending >= YOUNG_THRESHOLD and deadline - time.perf_counter() > self.young_cost * IDLE_MARGIN:
+            self.young_collections += 1
+            self.collect(1 if self.young_collections % MIDDLE_EVERY == 0 else 0)
+
+    def end_frame(self):
+        self.allocs += max(0, gc.get_count()[0] - self.pending_at)
+        self.pending_at = gc.get_count()[0]
+        if self.trace:
+            self.alloc_bytes = max(0, tracemalloc.get_traced_memory()[1] - self.traced_at)
@@ -0,0 +1,201 @@
+import json
+import mmap
+import os
+import struct
+import sys
+
+LEVEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels")
+DEFAULT_LEVEL = os.path.join(LEVEL_DIR, "level1.json")
+
+# Binary levels are split into vertical chunks of this many pixels
+STREAM_CHUNK_WIDTH = 640
+
+# ---------------- BINARY FORMAT ----------------
+# header | chunk table | per-chunk records (platforms, enemies, keys)
+# Platforms are written into every chunk they overlap and carry an id so the
+# loader can tell a copy it already instantiated. Enemies and keys belong to
+# the chunk their spawn x falls in. Everything is little-endian.
+MAGIC = b"KDLV"
+VERSION = 2
+HEADER = struct.Struct("<4sHHIIIiiiiII")
+# Header flags
+FLAG_CHASE = 1
+CHUNK_ENTRY = struct.Struct("<IHHH2x")
+PLATFORM_RECORD = struct.Struct("<Iiiii")
+# Enemy: spawn id, x, y, patrol width, speed
+ENEMY_RECORD = struct.Struct("<Iiidd")
+KEY_RECORD = struct.Struct("<Iii")
+
+# Enemy entries may leave out patrol width and speed, like the old Enemy class
+ENEMY_DEFAULTS = (100, 2)
+
+
+class LevelError(Exception):
+    pass
+
+
+# ---------------- VALIDATION ----------------
+# JSON levels are checked as they load, so a bad entry is reported by name
+# instead of failing later inside compile() or the world
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def whole(path, field, value):
+    # Positions and sizes are stored as integers; 40.0 is fine, 40.5 is not
+    if not is_number(value) or not float(value).is_integer():
+        raise LevelError(f"{path}: {field} must be a whole number of pixels, got {value!r}")
+    return int(value)
+
+
+def record(path, field, values, count):
+    if not isinstance(values, list) or len(values) != count:
+        raise LevelError(f"{path}: {field} must be a list of {count} numbers, got {values!r}")
+    return tuple(whole(path, field, v) for v in values)
+
+
+def enemy_record(path, field, values):
+    if not isinstance(values, list) or len(values) not in (2, 4):
+        raise LevelError(f"{path}: {field} must be [x, y] or [x, y, patrol_width, speed], got {values!r}")
+    x, y = record(path, field, values[:2], 2)
+    patrol_width, speed = values[2:] or ENEMY_DEFAULTS
+    if not is_number(patrol_width) or not is_number(speed):
+        raise LevelError(f"{path}: {field} patrol width and speed must be numbers, got {values!r}")
+    return x, y, patrol_width, speed
+
+
+# ---------------- LEVEL ----------------
+class Level:
+    # A fully loaded level description: plain tuples, no sprites
+    def __init__(self, width, height, player_start, victory, platforms, enemies, keys, chase=False):
+        self.width = width
+        self.height = height
+        self.player_start = tuple(player_start)
+        self.victory = tuple(victory)
+        self.platforms = [tuple(p) for p in platforms]
+        self.enemies = [tuple(e) for e in enemies]
+        self.keys = [tuple(k) for k in keys]
+        # Enemies chase the player across platforms instead of patrolling
+        self.chase = chase
+
+    @property
+    def key_count(self):
+        return len(self.keys)
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        try:
+            return cls(whole(path, "width", data["width"]), whole(path, "height", data["height"]),
+                       record(path, "player_start", data["player_start"], 2),
+                       record(path, "victory", data["victory"], 2),
+                       [record(path, f"platforms[{i}]", p, 4) for i, p in enumerate(data["platforms"])],
+                       [enemy_record(path, f"enemies[{i}]", e) for i, e in enumerate(data["enemies"])],
+                       [record(path, f"keys[{i}]", k, 2) for i, k in enumerate(data["keys"])],
+                       data.get("chase", False))
+        except KeyError as e:
+            raise LevelError(f"{path}: missing field {e}") from None
+
+    def to_json(self, path):
+        data = {
+            "width": self.width,
+            "height": self.height,
+            "player_start": list(self.player_start),
+            "victory": list(self.victory),
+            "platforms": [list(p) for p in self.platforms],
+            "enemies": [list(e) for e in self.enemies],
+            "keys": [list(k) for k in self.keys],
+        }
+        if self.chase:
+            data["chase"] = True
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+    def compile(self, path, chunk_width=STREAM_CHUNK_WIDTH):
+        chunk_count = max(1, -(-self.width // chunk_width))
+        chunks = [([], [], []) for _ in range(chunk_count)]
+
+        def chunk_of(x):
+            return max(0, min(chunk_count - 1, int(x) // chunk_width))
+
+        for i, (x, y, w, h) in enumerate(self.platforms):
+            for col in range(chunk_of(x), chunk_of(x + w - 1) + 1):
+                chunks[col][0].append(PLATFORM_RECORD.pack(i, x, y, w, h))
+        for i, (x, y, patrol_width, speed) in enumerate(self.enemies):
+            chunks[chunk_of(x)][1].append(ENEMY_RECORD.pack(i, x, y, patrol_width, speed))
+        for i, (x, y) in enumerate(self.keys):
+            chunks[chunk_of(x)][2].append(KEY_RECORD.pack(i, x, y))
+
+        offset = HEADER.size + CHUNK_ENTRY.size * chunk_count
+        table = []
+        body = []
+        for platforms, enemies, keys in chunks:
+            table.append(CHUNK_ENTRY.pack(offset, len(platforms), len(enemies), len(keys)))
+            for records in (platforms, enemies, keys):
+                body.extend(records)
+                offset += sum(len(r) for r in records)
+
+        with open(path, "wb") as f:
+            flags = FLAG_CHASE if self.chase else 0
+            f.write(HEADER.pack(MAGIC, VERSION, flags, self.width, self.height, chunk_width,
+                                *self.player_start, *self.victory, chunk_count, len(self.keys)))
+            f.writelines(table)
+            f.writelines(body)
+
+
+# ---------------- LEVEL STREAM ----------------
+class LevelStream:
+    # A compiled level read through a memory map. Only the header and chunk
+    # table are parsed up front; read_chunk() decodes one chunk on demand.
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        if os.fstat(self.file.fileno()).st_size < HEADER.size:
+            self.file.close()
+            raise LevelError(f"{path}: truncated header")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, flags, self.width, self.height, self.chunk_width,
+         px, py, vx, vy, self.chunk_count, self.key_count) = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise LevelError(f"{path}: not a version {VERSION} level file")
+        self.player_start = (px, py)
+        self.victory = (vx, vy)
+        self.chase = bool(flags & FLAG_CHASE)
+
+    def read_chunk(self, col):
+        offset, n_platforms, n_enemies, n_keys = CHUNK_ENTRY.unpack_from(self.data, HEADER.size + CHUNK_ENTRY.size * col)
+        data = self.data
+        platforms = [PLATFORM_RECORD.unpack_from(data, offset + PLATFORM_RECORD.size * i) for i in range(n_platforms)]
+        offset += PLATFORM_RECORD.size * n_platforms
+        enemies = [ENEMY_RECORD.unpack_from(data, offset + ENEMY_RECORD.size * i) for i in range(n_enemies)]
+        offset += ENEMY_RECORD.size * n_enemies
+        keys = [KEY_RECORD.unpack_from(data, offset + KEY_RECORD.size * i) for i in range(n_keys)]
+        return platforms, enemies, keys
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_level(path=DEFAULT_LEVEL):
+    # .json levels load whole; compiled levels are streamed chunk by chunk
+    if path.endswith(".json"):
+        return Level.from_json(path)
+    return LevelStream(path)
+
+
+if __name__ == "__main__":
+    # python level.py level.json level.kdl [chunk_width]
+    if len(sys.argv) < 3:
+        print("usage: python level.py <level.json> <level.kdl> [chunk_width]")
+        sys.exit(1)
+    chunk_width = int(sys.argv[3]) if len(sys.argv) > 3 else STREAM_CHUNK_WIDTH
+    Level.from_json(sys.argv[1]).compile(sys.argv[2], chunk_width)
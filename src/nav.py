@@ -0,0 +1,182 @@
+import heapq
+from collections import namedtuple
+
+import numpy as np
+import pygame
+
+from spatial import SpatialHash
+
+NAV_CELL_SIZE = 160
+
+WALK, JUMP = 0, 1
+
+# to: node index; exit_x: where to leave the current platform (or, for a walk,
+# a point on the next one to head for); land_x: where to aim while airborne;
+# cost: estimated ticks to get from the middle of one platform to the other
+NavEdge = namedtuple("NavEdge", ["to", "kind", "exit_x", "land_x", "cost"])
+
+
+def jump_arc(jump_power, gravity, depth):
+    # Height above the take-off point after each tick of a jump, stepped like
+    # Player.apply_gravity, until the arc is depth pixels below take-off
+    heights = []
+    vel = jump_power
+    y = 0
+    while y < depth:
+        vel += gravity
+        y += vel
+        heights.append(-y)
+    return heights
+
+
+# ---------------- NAV GRAPH ----------------
+# One node per platform top. Walk edges join platforms at the same height that
+# touch; jump edges join any pair a jump (or a fall off an edge) can reach with
+# the given speed, jump power and gravity. Paths to the current goal node are
+# A* searches cached per start node, and the cache is only dropped when the
+# goal node changes.
+class NavGraph:
+    def __init__(self, rects, speed, jump_power, gravity, level_height):
+        # Sorted, so the same platforms always get the same node numbers
+        self.rects = sorted(pygame.Rect(r) for r in rects)
+        self.speed = speed
+        self.jump_power = jump_power
+        self.gravity = gravity
+        self.lefts = np.array([r.left for r in self.rects] or [0], np.int64)
+        self.rights = np.array([r.right for r in self.rects] or [0], np.int64)
+
+        self.index = SpatialHash(NAV_CELL_SIZE)
+        for node, rect in enumerate(self.rects):
+            self.index.insert(node, rect)
+
+        self.arc = jump_arc(jump_power, gravity, level_height)
+        self.apex = max(self.arc)
+        self.edges = [[] for _ in self.rects]
+        for node in range(len(self.rects)):
+            self.build_edges(node, level_height)
+
+        self.goal = None
+        self.paths = {}
+
+    def __len__(self):
+        return len(self.rects)
+
+    # ---------------- BUILD ----------------
+    def air_ticks(self, rise):
+        # Ticks until a jump comes down onto a top `rise` pixels above take-off,
+        # or None when the apex never gets there
+        if rise >= self.apex:
+            return None
+        peaked = False
+        for tick, height in enumerate(self.arc, 1):
+            if height == self.apex:
+                peaked = True
+            elif peaked and height <= rise:
+                return tick
+        return None
+
+    def build_edges(self, a, level_height):
+        speed = self.speed
+        A = self.rects[a]
+        reach = speed * len(self.arc)
+        area = pygame.Rect(A.left - reach, 0, A.width + 2 * reach, level_height)
+        for b in self.index.query(area):
+            if b == a:
+                continue
+            B = self.rects[b]
+            rise = A.top - B.top
+            if B.left >= A.right:
+                exit_x, land_x, gap = A.right - 1, B.left + 1, B.left - A.right
+            elif B.right <= A.left:
+                exit_x, land_x, gap = A.left, B.right - 2, A.left - B.right
+            elif rise > 0:
+                # Straight up onto an overlapping platform
+                exit_x = land_x = (max(A.left, B.left) + min(A.right, B.right)) // 2
+                gap = 0
+            elif B.left < A.left or B.right > A.right:
+                # Down past whichever edge of A leaves more of B to land on
+                if B.right - A.right >= A.left - B.left:
+                    exit_x, land_x = A.right - 1, A.right + 1
+                else:
+                    exit_x, land_x = A.left, A.left - 2
+                gap = 0
+            else:
+                continue
+
+            walk_in = abs(A.centerx - exit_x) / speed
+            walk_out = abs(land_x - B.centerx) / speed
+            if rise == 0 and gap == 0:
+                self.edges[a].append(NavEdge(b, WALK, land_x, land_x, walk_in + walk_out))
+                continue
+            ticks = self.air_ticks(rise)
+            if ticks is None or speed * ticks < gap:
+                continue
+            self.edges[a].append(NavEdge(b, JUMP, exit_x, land_x, walk_in + ticks + walk_out))
+
+    # ---------------- LOOKUP ----------------
+    def node_at(self, left, right, feet):
+        # The node whose top is exactly at feet and overlaps [left, right)
+        for node in self.index.query(pygame.Rect(left, feet, max(1, right - left), 1)):
+            rect = self.rects[node]
+            if rect.top == feet and rect.left < right and rect.right > left:
+                return node
+        return None
+
+    def landing(self, x, prev_feet, feet):
+        # The highest top crossed while the feet fell from prev_feet to feet
+        best = None
+        for node in self.index.query(pygame.Rect(x, prev_feet, 1, max(1, feet - prev_feet + 1))):
+            rect = self.rects[node]
+            if prev_feet <= rect.top <= feet and rect.left <= x < rect.right:
+                if best is None or rect.top < self.rects[best].top:
+                    best = node
+        return best
+
+    # ---------------- PATHS ----------------
+    def set_goal(self, goal):
+        if goal != self.goal:
+            self.goal = goal
+            self.paths.clear()
+
+    def find_path(self, start, goal):
+        # A* over nodes; returns the edges from start to goal, or None
+        rects = self.rects
+        speed = self.speed
+        goal_x = rects[goal].centerx
+        best = {start: 0.0}
+        came_from = {start: None}
+        heap = [(abs(rects[start].centerx - goal_x) / speed, 0.0, start)]
+        while heap:
+            _, cost, node = heapq.heappop(heap)
+            if node == goal:
+                path = []
+                while came_from[node] is not None:
+                    node, edge = came_from[node]
+                    path.append(edge)
+                path.reverse()
+                return path
+            if cost > best[node]:
+                continue
+            for edge in self.edges[node]:
+                new_cost = cost + edge.cost
+                if new_cost < best.get(edge.to, float("inf")):
+                    best[edge.to] = new_cost
+                    came_from[edge.to] = (node, edge)
+                    heapq.heappush(heap, (new_cost + abs(rects[edge.to].centerx - goal_x) / speed, new_cost, edge.to))
+        return None
+
+    def next_edge(self, start):
+        # First edge on the cached path from start to the goal
+        if start not in self.paths:
+            self.paths[start] = self.find_path(start, self.goal)
+        path = self.paths[start]
+        return path[0] if path else None
+
+    def steer(self, node, target_x):
+        # (x to head for, jump when there, x to aim for in the air)
+        if self.goal is None or node == self.goal:
+            return target_x, False, target_x
+        edge = self.next_edge(node)
+        if edge is None:
+            return target_x, False, target_x
+        return edge.exit_x, edge.kind == JUMP, edge.land_x
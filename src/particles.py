@@ -0,0 +1,144 @@
+import struct
+
+import numpy as np
+import pygame
+
+PARTICLE_GRAVITY = 0.15
+PARTICLE_DRAG = 0.99
+PARTICLE_MAX_LIFE = 40
+
+# Alpha is quantized so every (size, alpha) square can be built once up front
+ALPHA_LEVELS = 16
+MIN_SIZE, MAX_SIZE = 2, 5
+
+
+# PCG64 generator state: 128-bit state and increment, plus the buffered half word
+RNG_STATE = struct.Struct("<16s16sII")
+
+
+# ---------------- PARTICLE SYSTEM ----------------
+# Structure-of-arrays particle store. Live particles are always packed into
+# [0, count), so integration is one vectorized pass and dead ones are retired
+# by moving live particles from the tail into their slots.
+class ParticleSystem:
+    def __init__(self, capacity=16384, seed=None):
+        self.capacity = capacity
+        self.count = 0
+        self.rng = np.random.default_rng(seed)
+
+        self.x = np.zeros(capacity, np.float32)
+        self.y = np.zeros(capacity, np.float32)
+        self.vx = np.zeros(capacity, np.float32)
+        self.vy = np.zeros(capacity, np.float32)
+        self.life = np.zeros(capacity, np.int32)
+        self.size = np.zeros(capacity, np.int32)
+        self.arrays = (self.x, self.y, self.vx, self.vy, self.life, self.size)
+
+        self.squares = None
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    # ---------------- SNAPSHOT ----------------
+    def pack(self):
+        # Generator state, then every live particle array by array
+        state = self.rng.bit_generator.state
+        rng = RNG_STATE.pack(state["state"]["state"].to_bytes(16, "little"), state["state"]["inc"].to_bytes(16, "little"),
+                             state["has_uint32"], state["uinteger"])
+        n = self.count
+        return rng + b"".join(array[:n].tobytes() for array in self.arrays)
+
+    def unpack(self, data, offset, count):
+        # Restores count particles packed at data[offset:]; returns the end offset
+        rng_state, inc, has_uint32, uinteger = RNG_STATE.unpack_from(data, offset)
+        offset += RNG_STATE.size
+        self.rng.bit_generator.state = {
+            "bit_generator": "PCG64",
+            "state": {"state": int.from_bytes(rng_state, "little"), "inc": int.from_bytes(inc, "little")},
+            "has_uint32": has_uint32,
+            "uinteger": uinteger,
+        }
+        for array in self.arrays:
+            array[:count] = np.frombuffer(data, array.dtype, count, offset)
+            offset += count * array.itemsize
+        self.count = count
+        return offset
+
+    def emit(self, x, y, n=12):
+        # x and y are one burst center or arrays of them; each gets n particles.
+        # Bursts past capacity are clipped rather than growing the arrays
+        x = np.repeat(np.asarray(x, np.float32), n)
+        y = np.repeat(np.asarray(y, np.float32), n)
+        start = self.count
+        n = min(x.size, self.capacity - start)
+        if n <= 0:
+            return
+        end = start + n
+        rng = self.rng
+        self.x[start:end] = x[:n] + rng.uniform(-8, 8, n)
+        self.y[start:end] = y[:n] + rng.uniform(-8, 8, n)
+        self.vx[start:end] = rng.uniform(-4, 4, n)
+        self.vy[start:end] = rng.uniform(-6, -1, n)
+        self.life[start:end] = rng.integers(20, PARTICLE_MAX_LIFE + 1, n)
+        self.size[start:end] = rng.integers(MIN_SIZE, MAX_SIZE + 1, n)
+        self.count = end
+
+    def update(self):
+        n = self.count
+        if n == 0:
+            return
+        x, y, vx, vy, life = self.x[:n], self.y[:n], self.vx[:n], self.vy[:n], self.life[:n]
+        x += vx
+        y += vy
+        vy += PARTICLE_GRAVITY
+        life -= 1
+        vx *= PARTICLE_DRAG
+
+        alive = life > 0
+        live = int(np.count_nonzero(alive))
+        if live == n:
+            return
+        # Holes in the packed prefix are filled by the live particles past it
+        holes = np.flatnonzero(~alive[:live])
+        movers = np.flatnonzero(alive[live:]) + live
+        for array in self.arrays:
+            array[holes] = array[movers]
+        self.count = live
+
+    # ---------------- RENDER ----------------
+    def build_squares(self):
+        squares = {}
+        for size in range(MIN_SIZE, MAX_SIZE + 1):
+            for level in range(ALPHA_LEVELS):
+                surf = pygame.Surface((size, size), pygame.SRCALPHA)
+                surf.fill((255, 255, 255, level * 255 // (ALPHA_LEVELS - 1)))
+                squares[size, level] = surf
+        self.squares = squares
+
+    def submit(self, queue, view, layer, alpha=1.0):
+        # Queues the particles inside view on a RenderQueue. alpha < 1 draws
+        # them that far between the previous tick and this one.
+        n = self.count
+        if n == 0:
+            return
+        if self.squares is None:
+            self.build_squares()
+
+        if alpha >= 1.0:
+            x = self.x[:n].astype(np.int32)
+            y = self.y[:n].astype(np.int32)
+        else:
+            back = 1.0 - alpha
+            x = (self.x[:n] - self.vx[:n] * back).astype(np.int32)
+            y = (self.y[:n] - (self.vy[:n] - PARTICLE_GRAVITY) * back).astype(np.int32)
+        visible = np.flatnonzero((x > view.left - MAX_SIZE) & (x < view.right) & (y > view.top - MAX_SIZE) & (y < view.bottom))
+        if visible.size == 0:
+            return
+        levels = np.clip(self.life[visible] * (ALPHA_LEVELS - 1) // PARTICLE_MAX_LIFE, 0, ALPHA_LEVELS - 1)
+
+        squares = self.squares
+        queue.submit_many([squares[size, level] for size, level in zip(self.size[visible].tolist(), levels.tolist())],
+                          x[visible].tolist(), y[visible].tolist(), layer)
@@ -0,0 +1,156 @@
+import csv
+import json
+import time
+
+import numpy as np
+import pygame
+
+PHASES = ("input", "physics", "enemies", "collision", "particles", "audio", "draw", "flip", "gc", "idle")
+# allocs is the net count of new GC-tracked objects, alloc_kb the bytes
+# tracemalloc saw allocated (0 unless tracing), gc_hitch_us the collection
+# time spent outside the frame's idle time
+COUNTERS = ("entities", "live_particles", "blits", "surfaces", "voices",
+            "allocs", "alloc_kb", "gc_pause_us", "gc_hitch_us")
+HISTORY = 3600
+GRAPH_FRAMES = 240
+
+PANEL_SIZE = (400, 165)
+# Graph scale: the top of the panel graph is this many ms
+GRAPH_MAX_MS = 33.3
+# Text is re-rendered every this many frames so the overlay stays cheap
+TEXT_EVERY = 30
+
+
+# ---------------- FRAME PROFILER ----------------
+# Charges wall time to named phases with one perf_counter() per mark().
+# The last HISTORY frames are kept in preallocated arrays (a ring buffer),
+# which feed the overlay and the CSV / Chrome trace exports.
+class FrameProfiler:
+    def __init__(self, history=HISTORY):
+        self.history = history
+        self.phase_index = {name: i for i, name in enumerate(PHASES)}
+        self.counter_index = {name: i for i, name in enumerate(COUNTERS)}
+        self.phase_ms = np.zeros((history, len(PHASES)), np.float32)
+        self.counter_values = np.zeros((history, len(COUNTERS)), np.int32)
+        self.frame_start = np.zeros(history, np.float64)
+        self.frames = 0
+        self.overlay_visible = False
+
+        self.origin = time.perf_counter()
+        self.last = self.origin
+        self.row = 0
+
+        self.panel = None
+        self.font = None
+        self.text = []
+
+    def begin_frame(self):
+        now = time.perf_counter()
+        self.row = self.frames % self.history
+        self.phase_ms[self.row] = 0
+        self.counter_values[self.row] = 0
+        self.frame_start[self.row] = now - self.origin
+        self.last = now
+
+    def mark(self, phase):
+        # Everything since the previous mark is charged to this phase
+        now = time.perf_counter()
+        self.phase_ms[self.row, self.phase_index[phase]] += (now - self.last) * 1000.0
+        self.last = now
+
+    def count(self, counter, value):
+        self.counter_values[self.row, self.counter_index[counter]] = value
+
+    def end_frame(self):
+        self.frames += 1
+
+    # ---------------- STATS ----------------
+    def recent(self, n=None):
+        # (phase_ms, counters, frame_start) for the last n frames, oldest first
+        stored = min(self.frames, self.history)
+        n = stored if n is None else min(n, stored)
+        end = self.frames % self.history
+        order = (np.arange(end - n, end)) % self.history
+        return self.phase_ms[order], self.counter_values[order], self.frame_start[order]
+
+    def percentiles(self, n=None):
+        phase_ms, _, _ = self.recent(n)
+        if len(phase_ms) == 0:
+            return 0.0, 0.0, 0.0
+        totals = phase_ms.sum(axis=1)
+        p50, p95, p99 = np.percentile(totals, (50, 95, 99))
+        return float(p50), float(p95), float(p99)
+
+    # ---------------- OVERLAY ----------------
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+
+    def overlay(self):
+        # The overlay panel for this frame, or None while it is hidden
+        if not self.overlay_visible or self.frames == 0:
+            return None
+        if self.panel is None:
+            self.panel = pygame.Surface(PANEL_SIZE)
+            self.panel.set_alpha(200)
+            self.font = pygame.font.SysFont(None, 16)
+
+        phase_ms, counters, _ = self.recent(GRAPH_FRAMES)
+        totals = phase_ms.sum(axis=1)
+        panel = self.panel
+        width, height = PANEL_SIZE
+        graph_top = 85
+        graph_height = height - graph_top - 4
+        panel.fill((0, 0, 0))
+
+        # 60 FPS budget line, then the frame-time graph
+        budget_y = graph_top + graph_height - int(graph_height * (1000.0 / 60) / GRAPH_MAX_MS)
+        pygame.draw.line(panel, (90, 90, 90), (0, budget_y), (width, budget_y))
+        if len(totals) > 1:
+            xs = np.linspace(0, width - 1, len(totals)).astype(int)
+            ys = graph_top + graph_height - np.minimum(totals / GRAPH_MAX_MS, 1.0) * graph_height
+            pygame.draw.lines(panel, (0, 255, 120), False, list(zip(xs.tolist(), ys.astype(int).tolist())))
+
+        if self.frames % TEXT_EVERY == 1 or not self.text:
+            p50, p95, p99 = self.percentiles(GRAPH_FRAMES)
+            means = phase_ms.mean(axis=0)
+            phases = [f"{name} {means[i]:.2f}" for i, name in enumerate(PHASES)]
+            last = counters[-1]
+            lines = [
+                f"frame p50 {p50:.1f}  p95 {p95:.1f}  p99 {p99:.1f} ms",
+                "  ".join(phases[:5]),
+                "  ".join(phases[5:]),
+                "  ".join(f"{name} {last[i]}" for i, name in enumerate(COUNTERS[:5])),
+                "  ".join(f"{name} {last[i + 5]}" for i, name in enumerate(COUNTERS[5:])),
+            ]
+            self.text = [self.font.render(line, True, (255, 255, 255)) for line in lines]
+        for i, text in enumerate(self.text):
+            panel.blit(text, (4, 4 + i * 15))
+        return panel
+
+    # ---------------- EXPORT ----------------
+    def export_csv(self, path):
+        phase_ms, counters, frame_start = self.recent()
+        first_frame = self.frames - len(phase_ms)
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("frame", "start_ms", "total_ms") + PHASES + COUNTERS)
+            for i in range(len(phase_ms)):
+                writer.writerow([first_frame + i, f"{frame_start[i] * 1000.0:.3f}", f"{phase_ms[i].sum():.3f}"]
+                                + [f"{v:.3f}" for v in phase_ms[i]] + counters[i].tolist())
+
+    def export_chrome_trace(self, path):
+        # Trace Event Format: one complete ("X") event per phase, counters as "C" events.
+        # Open in chrome://tracing or https://ui.perfetto.dev
+        phase_ms, counters, frame_start = self.recent()
+        events = []
+        for i in range(len(phase_ms)):
+            ts = frame_start[i] * 1e6
+            for p, name in enumerate(PHASES):
+                dur = float(phase_ms[i, p]) * 1000.0
+                if dur > 0:
+                    events.append({"name": name, "ph": "X", "ts": ts, "dur": dur, "pid": 1, "tid": 1})
+                ts += dur
+            events.append({"name": "counters", "ph": "C", "ts": frame_start[i] * 1e6, "pid": 1,
+                           "args": dict(zip(COUNTERS, counters[i].tolist()))})
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
@@ -1,661 +1,300 @@
+import argparse
 import pygame
 import sys
-import random
-
-pygame.init()
-
-# Window size
-WIDTH, HEIGHT = 800, 480
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Platformer Final Project")
-
-clock = pygame.time.Clock()
-FPS = 60
-
-# DAMAGE EFFECTS GLOBALS
-screen_shake = 0
-shake_intensity = 8
-
-red_flash_alpha = 0
-RED_FLASH_MAX = 140
-
-# Particle list for enemy hit bursts
-particles = []
-
-# ---------------- MAIN MENU ----------------
-def main_menu():
-    # Load background + title images
-    bg = pygame.image.load("assets/Screens/mainMenu.png").convert()
-    bg = pygame.transform.scale(bg, (WIDTH, HEIGHT))
-
-    title_img = pygame.image.load("assets/Titles/mainMenu_Title.png").convert_alpha()
-
-    try:
-        instr_font = pygame.font.Font("assets/pixel_font.ttf", 36)
-    except:
-        instr_font = pygame.font.SysFont(None, 36)
-
-    instr_text = instr_font.render("Press ENTER to Start", True, (255, 255, 255))
-
-    waiting = True
-    while waiting:
-        screen.blit(bg, (0, 0))
-        screen.blit(title_img, (WIDTH - title_img.get_width() - 20, 20))
-        screen.blit(instr_text, (WIDTH//2 - instr_text.get_width()//2, HEIGHT//2 + 120))
-        pygame.display.flip()
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN:
-                waiting = False
-
-    # Fade in transition
-    fade = pygame.Surface((WIDTH, HEIGHT))
-    fade.fill((0, 0, 0))
-    for alpha in range(255, -1, -15):
-        fade.set_alpha(alpha)
-        screen.blit(bg, (0, 0))
-        screen.blit(fade, (0, 0))
-        pygame.display.flip()
-        pygame.time.wait(30)
-
-main_menu()
-
-# World size
-LEVEL_WIDTH = 3000
-LEVEL_HEIGHT = 480
-
-# ---------------- PLAYER ----------------
-class Player(pygame.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
-
-        # Load sprites
-        self.idle = pygame.image.load("assets/player/player_Idle.png").convert_alpha()
-        self.walk_right = [
-            pygame.image.load("assets/player/player_Walk1.png").convert_alpha(),
-            pygame.image.load("assets/player/player_Walk2.png").convert_alpha(),
-            pygame.image.load("assets/player/player_Walk3.png").convert_alpha()
-        ]
-        self.walk_left = [pygame.transform.flip(frame, True, False) for frame in self.walk_right]
-
-        self.jump_frames = [
-            pygame.image.load("assets/player/player_Jump1.png").convert_alpha(),
-            pygame.image.load("assets/player/player_Jump2.png").convert_alpha()
-        ]
-
-        self.attack_right = [
-            pygame.image.load("assets/player/player_Attack1.png").convert_alpha(),
-            pygame.image.load("assets/player/player_Attack2.png").convert_alpha(),
-            pygame.image.load("assets/player/player_Attack3.png").convert_alpha()
-        ]
-        self.attack_left = [pygame.transform.flip(frame, True, False) for frame in self.attack_right]
-
-        # Initial state
-        self.image = self.idle
-        self.rect = self.image.get_rect(topleft=(x, y))
-
-        # Movement
-        self.vel_y = 0
-        self.speed = 5
-        self.jump_power = -15
-        self.on_ground = False
-        self.jump_count = 0
-        self.space_was_pressed = False
-
-        # Health
-        self.health = 3
-
-        # Attack
-        self.is_attacking = False
-        self.attack_timer = 0
-        self.attack_cooldown = 300
-        self.attack_index = 0
-        self.attack_speed = 0.2
-
-        # Animation
-        self.animation_index = 0
-        self.animation_speed = 0.15
-        self.direction = 1 
-
-        # Invincibility/knockback
-        self.invincible = False
-        self.invincible_timer = 0
-        self.knockback_timer = 0
-        self.knockback_dir = 0
-
-        # Death
-        self.dead = False
-        self.death_timer = 0
-
-    def handle_input(self):
-        if self.dead:
-            return
-        keys = pygame.key.get_pressed()
-
-        # Horizontal movement
-        if self.knockback_timer <= 0:
-            if keys[pygame.K_LEFT]:
-                self.rect.x -= self.speed
-                self.direction = -1
-            if keys[pygame.K_RIGHT]:
-                self.rect.x += self.speed
-                self.direction = 1
+import time
+
+from assets import SPRITE_CLIPS, assets
+from audio import MIXER_SETTINGS, Audio
+from display import SurfaceDisplay, TextureDisplay
+from gcpolicy import GC_MODES, GCPolicy
+from scenes import Scene
+from level import load_level
+from profiler import COUNTERS, FrameProfiler
+from replay import ReplayRecorder
+from world import WIDTH, HEIGHT, FPS, TILE_SIZE, World, read_inputs
+
+parser = argparse.ArgumentParser(description="Knights and Dungeons")
+parser.add_argument("level", nargs="?", default="", help="level file (.json or compiled .kdl)")
+parser.add_argument("--seed", type=int, default=None, help="seed for every random stream in the world")
+parser.add_argument("--record", metavar="PATH", help="record this session as a replay file")
+parser.add_argument("--profile", metavar="PREFIX", help="write PREFIX.csv and PREFIX.trace.json frame timings on exit")
+parser.add_argument("--renderer", choices=("software", "sdl2", "sdl2-software"), default="software",
+                    help="software blits (default), or SDL2 textures on the GPU / on SDL's software renderer")
+parser.add_argument("--gc", choices=GC_MODES, default="deferred",
+                    help="deferred (default) collects garbage only between scenes and in idle frame time; auto leaves it to Python")
+parser.add_argument("--gc-trace", action="store_true", help="also count allocated bytes per frame with tracemalloc (slow)")
+parser.add_argument("--hz", type=int, default=FPS, help=f"display frame rate, 30-240 (the simulation always ticks at {FPS} Hz)")
+
+# The simulation advances in fixed ticks; a slow frame runs several of them,
+# but never more than this, so a stall can't snowball into a longer one
+SIM_STEP = 1.0 / FPS
+MAX_STEPS_PER_FRAME = 8
+
+
+# ---------------- PRELOAD LIST ----------------
+def game_assets():
+    # Everything the first game frame and the end screens need, as (path, alpha, size)
+    requests = [(path, True, None) for paths in SPRITE_CLIPS.values() for path in paths]
+    requests += [
+        ("platforms/platform_Block.png", True, (TILE_SIZE, TILE_SIZE)),
+        ("background/map_Background_.png", False, None),
+        ("UI/heart_UI.png", True, None),
+        ("UI/key_UI.png", True, None),
+        ("Screens/gameOver.png", False, (WIDTH, HEIGHT)),
+        ("Screens/Victory.png", False, (WIDTH, HEIGHT)),
+        ("Titles/gameOver_Title.png", True, None),
+        ("Titles/Victory_Title.png", True, None),
+    ]
+    return requests
+
+
+class Game:
+    def __init__(self, args):
+        self.args = args
+        self.launch_time = time.perf_counter()
+
+        # The mixer buffer size only applies when set before pygame.init()
+        pygame.mixer.pre_init(*MIXER_SETTINGS)
+        pygame.init()
+
+        # Window size
+        if args.renderer == "software":
+            self.display = SurfaceDisplay((WIDTH, HEIGHT), "Platformer Final Project")
         else:
-            self.rect.x += 10 * self.knockback_dir
-
-        # Jumping / double jump
-        space_pressed = keys[pygame.K_SPACE]
-        if space_pressed and not self.space_was_pressed:
-            if self.on_ground:
-                self.vel_y = self.jump_power
-                self.on_ground = False
-                self.jump_count = 1
-            elif self.jump_count == 1:
-                self.vel_y = self.jump_power
-                self.jump_count = 2
-        self.space_was_pressed = space_pressed
-
-        # Attacking
-        if keys[pygame.K_x] and not self.is_attacking:
-            self.is_attacking = True
-            self.attack_timer = pygame.time.get_ticks()
-            self.attack_index = 0
-
-    def take_damage(self, source_x):
-        global screen_shake, red_flash_alpha
-        if self.invincible or self.dead:
-            return
-        self.health -= 1
-        self.invincible = True
-        self.invincible_timer = 90
-        self.knockback_dir = -1 if source_x > self.rect.centerx else 1
-        self.knockback_timer = 18
-        screen_shake = 14
-        red_flash_alpha = RED_FLASH_MAX
-        if self.health <= 0:
-            self.dead = True
-            self.death_timer = 60
-
-    def apply_gravity(self):
-        self.vel_y += 0.7
-        self.rect.y += self.vel_y
-
-    def update(self, platforms):
-        # Invincibility timer
-        if self.invincible:
-            self.invincible_timer -= 1
-            if self.invincible_timer <= 0:
-                self.invincible = False
-
-        if self.knockback_timer > 0:
-            self.knockback_timer -= 1
-
-        # Dead state
-        if self.dead:
-            self.rect.y += 1.0
-            self.death_timer -= 1
-            if self.death_timer <= 0:
-                game_over()
-            return
-
-        # Update movement
-        self.handle_input()
-        self.apply_gravity()
-        self.on_ground = False
-
-        # Platform collision
-        for platform in platforms:
-            if self.rect.colliderect(platform.rect) and self.vel_y >= 0:
-                self.rect.bottom = platform.rect.top
-                self.vel_y = 0
-                self.on_ground = True
-                self.jump_count = 0
-
-        # Boundaries
-        if self.rect.left < 0:
-            self.rect.left = 0
-        if self.rect.right > LEVEL_WIDTH:
-            self.rect.right = LEVEL_WIDTH
-
-        # ---- ANIMATION ----
-        if self.is_attacking:
-            self.attack_index += self.attack_speed
-            if self.direction == 1:
-                frames = self.attack_right
-            else:
-                frames = self.attack_left
-
-            if self.attack_index >= len(frames):
-                self.attack_index = 0
-                self.is_attacking = False
-
-            self.image = frames[int(self.attack_index)]
-        elif not self.on_ground:
-            # Jumping - keep last jump frame until landing
-            self.image = self.jump_frames[-1]
-        elif pygame.key.get_pressed()[pygame.K_LEFT] or pygame.key.get_pressed()[pygame.K_RIGHT]:
-            # Walking
-            self.animation_index += self.animation_speed
-            frames = self.walk_right if self.direction == 1 else self.walk_left
-            if self.animation_index >= len(frames):
-                self.animation_index = 0
-            self.image = frames[int(self.animation_index)]
-        else:
-            # Idle
-            self.image = self.idle
-
-
-# ---------------- PLATFORM ----------------
-TILE_SIZE = 40
-
-class Platform(pygame.sprite.Sprite):
-    def __init__(self, x, y, w, h, tile_surface):
-        super().__init__()
-        # Create a surface sized to the platform
-        self.image = pygame.Surface((w, h), pygame.SRCALPHA)
-        # Tile the platform with the provided tile surface
-        for i in range(0, w, TILE_SIZE):
-            for j in range(0, h, TILE_SIZE):
-                self.image.blit(tile_surface, (i, j))
-        self.rect = self.image.get_rect(topleft=(x, y))
-
-# ---------------- ENEMY ----------------
-class Enemy(pygame.sprite.Sprite):
-    def __init__(self, x, y, patrol_width=100, speed=2):
-        super().__init__()
-        self.images = [
-            pygame.image.load("assets/enemies/enemy_Walk1.png").convert_alpha(),
-            pygame.image.load("assets/enemies/enemy_Walk2.png").convert_alpha(),
-            pygame.image.load("assets/enemies/enemy_Walk3.png").convert_alpha()
-        ]
-        self.image = self.images[0]
-        self.rect = self.image.get_rect(topleft=(x, y))
-
-        self.hitbox_offset_x = .5
-        self.hitbox_offset_y = .5
-        self.hitbox = pygame.Rect(
-            self.rect.x + self.hitbox_offset_x, 
-            self.rect.y + self.hitbox_offset_y,
-            self.rect.width - .5*self.hitbox_offset_x,
-            self.rect.height - .5*self.hitbox_offset_y
-        )
-
-        self.start_x = x
-        self.patrol_width = patrol_width
-        self.speed = speed
-        self.direction = 1
-        self.dead_anim = 0
-        self.animation_index = 0
-        self.animation_speed = 0.1
-
-    def update(self):
-        if self.dead_anim > 0:
-            self.dead_anim -= 1
-            self.rect.y += 2
-            return
-
-        # Patrol movement
-        self.rect.x += self.speed * self.direction
-        if self.rect.x > self.start_x + self.patrol_width or self.rect.x < self.start_x:
-            self.direction *= -1
-
-        # Update hitbox position
-        self.hitbox.topleft = (self.rect.x + self.hitbox_offset_x, self.rect.y + self.hitbox_offset_y)
-
-        # Animate and flip based on movement direction
-        self.animation_index += self.animation_speed
-        if self.animation_index >= len(self.images):
-            self.animation_index = 0
-        frame = self.images[int(self.animation_index)]
-        self.image = pygame.transform.flip(frame, self.direction == 1, False)
-
-
-
-# ---------------- COLLECTIBLE ----------------
-class Collectible(pygame.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
+            self.display = TextureDisplay((WIDTH, HEIGHT), "Platformer Final Project",
+                                          software=args.renderer == "sdl2-software")
+        self.screen = self.display.surface
+
+        self.clock = pygame.time.Clock()
+
+        # Holds the last game frame while fading out of it, allocated once
+        self.transition_surface = pygame.Surface((WIDTH, HEIGHT))
+
+        # Effects are decoded here; the music streams from disk from the menu on
+        self.audio = Audio()
+        self.audio.play_music()
+
+        # Built behind the menu; the recorder only when --record is given
+        self.recorder = None
+        self.world = None
+        self.renderer = None
+        self.menu_closed = 0.0
+
+        # Per-phase frame timings: F3 toggles the overlay, F4 exports the trace
+        self.profiler = FrameProfiler()
+        # Garbage collection timing; in deferred mode nothing collects mid-frame
+        self.gc = GCPolicy(args.gc, args.gc_trace)
+
+        # The level is parsed up front so its assets can decode behind the menu
+        self.level = load_level(args.level) if args.level else load_level()
+        assets.preload(game_assets())
+
+    def export_profile(self, prefix):
+        self.profiler.export_csv(prefix + ".csv")
+        self.profiler.export_chrome_trace(prefix + ".trace.json")
+        _, counters, _ = self.profiler.recent()
+        pauses = counters[:, COUNTERS.index("gc_pause_us")]
+        hitches = counters[:, COUNTERS.index("gc_hitch_us")]
+        print(f"gc ({self.args.gc}): {len(counters)} frames, {int((pauses > 0).sum())} with a collection "
+              f"(longest {int(pauses.max(initial=0))} us), {int((hitches > 0).sum())} collected outside idle time")
+
+    def quit_game(self):
+        if self.recorder is not None:
+            self.recorder.save(self.args.record)
+        if self.args.profile:
+            self.export_profile(self.args.profile)
+        if self.world is not None:
+            self.world.close()
+        pygame.quit()
+        sys.exit()
+
+    # ---------------- WORLD SETUP ----------------
+    def build_world(self):
+        args = self.args
+        self.world = World(seed=args.seed, level=self.level)
+        self.recorder = ReplayRecorder(self.world, args.level) if args.record else None
+
+    def build_renderer(self):
+        self.renderer = self.display.world_renderer(self.world)
+
+    # ---------------- MAIN MENU ----------------
+    def main_menu(self):
+        # Load background + title images
+        bg = assets.scaled("Screens/mainMenu.png", (WIDTH, HEIGHT), alpha=False)
+
+        title_img = assets.image("Titles/mainMenu_Title.png")
+
         try:
-            self.image = pygame.image.load("assets/interactibles/key_Collectible.png").convert_alpha()
-        except Exception as e:
-            print("Error loading collectible image:", e)
-            # fallback: yellow square
-            self.image = pygame.Surface((20, 20))
-            self.image.fill((255, 255, 0))
-        self.rect = self.image.get_rect(topleft=(x, y))
-
-
-# ---------------- VICTORY BLOCK ----------------
-class VictoryBlock(pygame.sprite.Sprite):
-    def __init__(self, x, y):
-        super().__init__()
-        # Load victory gate sprite
-        self.image = pygame.image.load("assets/interactibles/victory_Gate.png").convert_alpha()
-        self.rect = self.image.get_rect(topleft=(x, y))
-
-# ---------------- Helper: fade to white ----------------
-def fade_to_white(duration_ms=800):
-    snapshot = screen.copy()
-    white = pygame.Surface((WIDTH, HEIGHT))
-    white.fill((255, 255, 255))
-
-    start = pygame.time.get_ticks()
-    while True:
-        now = pygame.time.get_ticks()
-        t = (now - start) / duration_ms
-        if t >= 1.0:
-            # full white at end
-            screen.blit(snapshot, (0, 0))
-            white.set_alpha(255)
-            screen.blit(white, (0, 0))
-            pygame.display.flip()
-            break
-
-        alpha = int(t * 255)
-        screen.blit(snapshot, (0, 0))
-        white.set_alpha(alpha)
-        screen.blit(white, (0, 0))
-        pygame.display.flip()
-        clock.tick(FPS)
-
-# ---------------- SCENE FUNCTIONS ----------------
-def game_over():
-    bg = pygame.image.load("assets/Screens/gameOver.png").convert()
-    bg = pygame.transform.scale(bg, (WIDTH, HEIGHT))
-    title_img = pygame.image.load("assets/Titles/gameOver_Title.png").convert_alpha()
-    font_small = pygame.font.SysFont(None, 36)
-    retry = font_small.render("Press R to Retry", True, (255, 255, 255))
-    exit_game = font_small.render("Press Q to Exit", True, (255, 255, 255))
-    running = True
-    while running:
-        screen.blit(bg, (0, 0))
-        screen.blit(title_img, (WIDTH//2 - title_img.get_width()//2, 40))
-        screen.blit(retry, (WIDTH//2 - retry.get_width()//2, HEIGHT//2))
-        screen.blit(exit_game, (WIDTH//2 - exit_game.get_width()//2, HEIGHT//2 + 40))
-        pygame.display.flip()
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_r:
-                    reset_game()
-                    return
-                elif event.key == pygame.K_q:
-                    pygame.quit()
-                    sys.exit()
-
-def victory_screen():
-    bg = pygame.image.load("assets/Screens/Victory.png").convert()
-    bg = pygame.transform.scale(bg, (WIDTH, HEIGHT))
-
-    title_img = pygame.image.load("assets/Titles/Victory_Title.png").convert_alpha()
-
-    font_small = pygame.font.SysFont(None, 36)
-    restart = font_small.render("Press R to Restart", True, (255, 255, 255))
-    exit_game = font_small.render("Press Q to Exit", True, (255, 255, 255))
-
-    waiting = True
-    while waiting:
-        screen.blit(bg, (0, 0))
-
-        # VICTORY title
-        screen.blit(title_img, (WIDTH//2 - title_img.get_width()//2, 40))
-
-        # Buttons
-        screen.blit(restart, (WIDTH//2 - restart.get_width()//2, HEIGHT//2))
-        screen.blit(exit_game, (WIDTH//2 - exit_game.get_width()//2, HEIGHT//2 + 40))
-
-        pygame.display.flip()
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_r:
-                    reset_game()
-                    waiting = False
-                elif event.key == pygame.K_q:
-                    pygame.quit()
-                    sys.exit()
-
-# ---------------- RESET GAME ----------------
-def reset_game():
-    global collected_count, particles, screen_shake, red_flash_alpha
-    player.rect.topleft = (100, 300)
-    player.health = 3
-    player.vel_y = 0
-    player.jump_count = 0
-    player.invincible = False
-    player.invincible_timer = 0
-    player.knockback_timer = 0
-    player.dead = False
-    player.death_timer = 0
-    player.is_attacking = False
-
-    enemies.empty()
-    enemies.add(Enemy(360, 290, patrol_width=80, speed=2))
-    enemies.add(Enemy(930, 200, patrol_width=100, speed=2))
-    enemies.add(Enemy(1350, 220, patrol_width=160, speed=2))
-    enemies.add(Enemy(1590, 160, patrol_width=120, speed=2.4))
-    enemies.add(Enemy(2120, 280, patrol_width=150, speed=3))
-
-    collectibles.empty()
-    for pos in collectible_positions:
-        collectibles.add(Collectible(*pos))
-
-    collected_count = 0
-    particles = []
-    screen_shake = 0
-    red_flash_alpha = 0
-
-# ---------------- CREATE WORLD ----------------
-player = Player(100, 300)
-
-# Load platform 
-try:
-    platform_tile = pygame.image.load("assets/platforms/platform_Block.png").convert_alpha()
-    platform_tile = pygame.transform.scale(platform_tile, (TILE_SIZE, TILE_SIZE))
-except Exception as e:
-    print("Warning: couldn't load platform tile - using fallback. Error:", e)
-    platform_tile = pygame.Surface((TILE_SIZE, TILE_SIZE))
-    platform_tile.fill((120, 80, 40))
-
-platforms = pygame.sprite.Group()
-platform_data = [
-    (0, 440, 3000, 40),             
-
-    # Section 1
-    (350, 330, 160, 40),
-
-    # Section 2
-    (700, 300, 120, 40),
-    (900, 240, 120, 40),
-
-    # Section 3 (Skeleton Gauntlet)
-    (1300, 260, 240, 40),
-    (1600, 200, 160, 40),
-
-    # Section 4 (Final Stretch)
-    (2100, 320, 240, 40),
-    (2400, 280, 160, 40),
-]
-
-for p in platform_data:
-    x, y, w, h = p
-    platforms.add(Platform(x, y, w, h, platform_tile))
-
-# Enemies (positioned so their bottoms sit flush on platform surfaces)
-enemies = pygame.sprite.Group()
-
-# Section 1 enemy 
-enemies.add(Enemy(360, 290, patrol_width=80, speed=2))
-
-# Section 2 enemy 
-enemies.add(Enemy(890, 200, patrol_width=100, speed=2))
-
-# Section 3 – Skeleton Gauntlet
-enemies.add(Enemy(1350, 220, patrol_width=160, speed=2))
-enemies.add(Enemy(1590, 160, patrol_width=120, speed=2.4))
-
-# Section 4 – last enemy before gate
-enemies.add(Enemy(2120, 280, patrol_width=150, speed=3))
-
-# Collectibles: placed on top of platforms 
-collectible_positions = [
-    # Section 1 
-    (350 + 160//2 - 10, 330 - 20),
-
-    # Section 2 
-    (900 + 120//2 - 10, 240 - 20),
-
-    # Section 3 left platform 
-    (1300 + 240//2 - 10, 260 - 20),
-    # Section 3 upper platform 
-    (1600 + 160//2 - 10, 200 - 20),
-
-    # Section 4 final collectible on last platform 
-    (2400 + 160//2 - 10, 280 - 20),
-]
-
-collectibles = pygame.sprite.Group()
-for pos in collectible_positions:
-    collectibles.add(Collectible(*pos))
-
-collected_count = 0
-
-victory_block = VictoryBlock(2800, 360)
-
-# ---------------- LOAD DUNGEON BACKGROUND ----------------
-dungeon_bg = pygame.image.load("assets/background/map_Background_.png").convert()
-dungeon_bg = pygame.transform.scale(dungeon_bg, (LEVEL_WIDTH, LEVEL_HEIGHT))
-
-# ---------------- CAMERA ----------------
-def get_camera_offset(shake_x=0, shake_y=0):
-    camera_x = player.rect.centerx - WIDTH // 2
-    camera_x = max(0, min(camera_x, LEVEL_WIDTH - WIDTH))
-    return camera_x + shake_x, 0 + shake_y
-
-# ---------------- MAIN GAME LOOP ----------------
-trigger_victory = False
-
-while True:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-
-    # Update
-    player.update(platforms)
-    enemies.update()
-
-    hit_list = pygame.sprite.spritecollide(player, collectibles, True)
-    if hit_list:
-        collected_count += len(hit_list)
-
-    for enemy in enemies.copy():
-        if player.is_attacking:
-            attack_range = pygame.Rect(0, 0, 50, 40)
-            keys = pygame.key.get_pressed()
-            if keys[pygame.K_LEFT]:
-                attack_range.topleft = (player.rect.left - 50, player.rect.centery - 20)
-            else:
-                attack_range.topleft = (player.rect.right, player.rect.centery - 20)
-            if attack_range.colliderect(enemy.rect):
-                for _ in range(12):
-                    particles.append({
-                        "x": enemy.rect.centerx + random.uniform(-8,8),
-                        "y": enemy.rect.centery + random.uniform(-8,8),
-                        "vx": random.uniform(-4, 4),
-                        "vy": random.uniform(-6, -1),
-                        "life": random.randint(20, 40),
-                        "size": random.randint(2, 5)
-                    })
-                enemies.remove(enemy)
-                continue
-
-        if player.rect.colliderect(enemy.rect) and not player.invincible and not player.is_attacking:
-            player.take_damage(enemy.rect.centerx)
-
-    # If player reaches victory gate and all collectibles collected, trigger fade+victory.
-    if player.rect.colliderect(victory_block.rect) and collected_count == len(collectible_positions):
-        trigger_victory = True
-
-    if screen_shake > 0:
-        screen_shake -= 1
-
-    for p in particles[:]:
-        p["x"] += p["vx"]
-        p["y"] += p["vy"]
-        p["vy"] += 0.15
-        p["life"] -= 1
-        p["vx"] *= 0.99
-        if p["life"] <= 0:
-            particles.remove(p)
-
-    shake_x = 0
-    shake_y = 0
-    if screen_shake > 0:
-        shake_x = random.randint(-shake_intensity, shake_intensity)
-        shake_y = random.randint(-shake_intensity//2, shake_intensity//2)
-    camera_x, camera_y = get_camera_offset(shake_x, shake_y)
-
-    # ---------------- DRAW ----------------
-    # Parallax background
-    parallax_x = -camera_x * 0.5
-    screen.blit(dungeon_bg, (parallax_x, -camera_y))
-
-    for platform in platforms:
-        screen.blit(platform.image, (platform.rect.x - camera_x + shake_x, platform.rect.y - camera_y + shake_y))
-    for enemy in enemies:
-        screen.blit(enemy.image, (enemy.rect.x - camera_x + shake_x, enemy.rect.y - camera_y + shake_y))
-    for c in collectibles:
-        screen.blit(c.image, (c.rect.x - camera_x + shake_x, c.rect.y - camera_y + shake_y))
-    screen.blit(victory_block.image, (victory_block.rect.x - camera_x + shake_x, victory_block.rect.y - camera_y + shake_y))
-    screen.blit(player.image, (player.rect.x - camera_x + shake_x, player.rect.y - camera_y + shake_y))
-
-    for p in particles:
-        alpha = max(0, min(255, int(255 * (p["life"] / 40))))
-        surf = pygame.Surface((p["size"], p["size"]), pygame.SRCALPHA)
-        surf.fill((255, 255, 255, alpha))
-        screen.blit(surf, (p["x"] - camera_x + shake_x, p["y"] - camera_y + shake_y))
-
-    if red_flash_alpha > 0:
-        flash_surface = pygame.Surface((WIDTH, HEIGHT))
-        flash_surface.fill((255, 0, 0))
-        flash_surface.set_alpha(int(red_flash_alpha))
-        screen.blit(flash_surface, (0, 0))
-        red_flash_alpha = max(0, red_flash_alpha - 6)
-
-    # Health UI
-    heart_size = 18
-    heart_gap = 6
-    for i in range(3):
-        x = 10 + i * (heart_size + heart_gap)
-        y = 10
-        color = (220, 20, 60) if i < player.health else (80, 80, 80)
-        pygame.draw.rect(screen, color, (x, y, heart_size, heart_size), 0, border_radius=4)
-
-    # Collectible UI (faint until collected)
-    key_size = 18
-    key_gap = 6
-    for i in range(len(collectible_positions)):
-        x = 10 + i * (key_size + key_gap)
-        y = 40
-        color = (255, 215, 0) if i < collected_count else (120, 120, 60)
-        pygame.draw.rect(screen, color, (x, y, key_size, key_size), 0, border_radius=4)
-
-    pygame.display.flip()
-
-    # If victory triggered, do fade-to-white transition, then show victory screen.
-    if trigger_victory:
-        fade_to_white(800)
-        victory_screen()
-        trigger_victory = False
-        # After victory_screen (which can call reset_game), continue main loop
-
-    clock.tick(FPS)
+            instr_font = pygame.font.Font("assets/pixel_font.ttf", 36)
+        except:
+            instr_font = pygame.font.SysFont(None, 36)
+
+        instr_text = instr_font.render("Press ENTER to Start", True, (255, 255, 255))
+
+        scene = Scene(self.display, bg, [
+            (title_img, (WIDTH - title_img.get_width() - 20, 20)),
+            (instr_text, (WIDTH//2 - instr_text.get_width()//2, HEIGHT//2 + 120)),
+        ], on_quit=self.quit_game)
+
+        def start():
+            # Fade in transition over the bare background
+            scene.keys.clear()
+            scene.set_overlays([])
+            scene.start_fade((0, 0, 0), 255, 0, 540, on_done=scene.stop)
+
+        # The world, its renderer and the post-load freeze are built while the
+        # menu sits idle, so ENTER only has to play the fade. The level, its
+        # assets and the world live until exit; freezing them means
+        # collections never walk them again.
+        scene.when_idle(self.build_world)
+        scene.when_idle(self.build_renderer)
+        scene.when_idle(self.gc.freeze)
+
+        scene.on_key(pygame.K_RETURN, start)
+        scene.run()
+        # Pressed before the menu got through it all, the rest runs now
+        self.menu_closed = time.perf_counter()
+        scene.finish_idle()
+
+    # ---------------- Helper: fade to white ----------------
+    def fade_to_white(self, renderer, duration_ms=800):
+        # The last game frame is drawn again and read back, which works the
+        # same whether it lives on a surface or in a renderer
+        renderer.draw()
+        self.display.capture(self.transition_surface)
+        scene = Scene(self.display, self.transition_surface, on_quit=self.quit_game)
+        scene.start_fade((255, 255, 255), 0, 255, duration_ms, on_done=scene.stop)
+        scene.run()
+
+    # ---------------- SCENE FUNCTIONS ----------------
+    def end_screen(self, bg, title_img, prompt):
+        # The game frame is gone behind this screen, so a full collection can't be seen
+        self.gc.transition()
+        font_small = pygame.font.SysFont(None, 36)
+        prompt_text = font_small.render(prompt, True, (255, 255, 255))
+        exit_game = font_small.render("Press Q to Exit", True, (255, 255, 255))
+        scene = Scene(self.display, bg, [
+            (title_img, (WIDTH//2 - title_img.get_width()//2, 40)),
+            (prompt_text, (WIDTH//2 - prompt_text.get_width()//2, HEIGHT//2)),
+            (exit_game, (WIDTH//2 - exit_game.get_width()//2, HEIGHT//2 + 40)),
+        ], on_quit=self.quit_game)
+
+        def retry():
+            self.world.reset()
+            scene.stop()
+
+        scene.on_key(pygame.K_r, retry)
+        scene.on_key(pygame.K_q, self.quit_game)
+        scene.run()
+
+    def game_over(self):
+        bg = assets.scaled("Screens/gameOver.png", (WIDTH, HEIGHT), alpha=False)
+        title_img = assets.image("Titles/gameOver_Title.png")
+        self.end_screen(bg, title_img, "Press R to Retry")
+
+    def victory_screen(self):
+        bg = assets.scaled("Screens/Victory.png", (WIDTH, HEIGHT), alpha=False)
+        title_img = assets.image("Titles/Victory_Title.png")
+        self.end_screen(bg, title_img, "Press R to Restart")
+
+    # ---------------- MAIN GAME LOOP ----------------
+    def run(self):
+        self.main_menu()
+
+        args = self.args
+        world = self.world
+        display = self.display
+        renderer = self.renderer
+        profiler = self.profiler
+        recorder = self.recorder
+        audio = self.audio
+        gc = self.gc
+        world.profiler = profiler
+        first_frame = True
+        hz = max(30, min(240, args.hz))
+        accumulator = 0.0
+        last_time = time.perf_counter()
+        frame_time = 1.0 / hz
+        while True:
+            profiler.begin_frame()
+            gc.begin_frame()
+            frame_start = time.perf_counter()
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.quit_game()
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_F3:
+                        profiler.toggle_overlay()
+                    elif event.key == pygame.K_F4:
+                        self.export_profile(args.profile or "profile")
+
+            # Update: as many fixed ticks as the elapsed time covers
+            now = time.perf_counter()
+            accumulator += now - last_time
+            last_time = now
+            inputs = read_inputs()
+            profiler.mark("input")
+            steps = 0
+            while accumulator >= SIM_STEP and steps < MAX_STEPS_PER_FRAME and not world.done:
+                world.step(inputs)
+                audio.queue(world.events)
+                if recorder is not None:
+                    recorder.record(inputs)
+                accumulator -= SIM_STEP
+                steps += 1
+            if steps == MAX_STEPS_PER_FRAME:
+                accumulator = min(accumulator, SIM_STEP)
+            audio.update()
+            profiler.mark("audio")
+            if world.game_over:
+                self.game_over()
+                accumulator = 0.0
+                last_time = time.perf_counter()
+
+            renderer.draw(min(1.0, accumulator / SIM_STEP))
+            panel = profiler.overlay()
+            if panel is not None:
+                display.blit(panel, (WIDTH - panel.get_width() - 8, 8))
+            profiler.mark("draw")
+            display.flip()
+            profiler.mark("flip")
+
+            if first_frame:
+                first_frame = False
+                now = time.perf_counter()
+                print(f"time to first frame: {(now - self.launch_time) * 1000:.0f} ms from launch, "
+                      f"{(now - self.menu_closed) * 1000:.0f} ms after the menu")
+
+            profiler.count("entities", len(world.enemies) + len(world.collectibles) + 2)
+            profiler.count("live_particles", len(world.particles))
+            profiler.count("blits", renderer.blits)
+            profiler.count("surfaces", renderer.surfaces)
+            profiler.count("voices", audio.voices)
+
+            # If victory triggered, do fade-to-white transition, then show victory screen.
+            if world.victory:
+                self.fade_to_white(renderer, 800)
+                self.victory_screen()
+                # After victory_screen (which resets the world), continue main loop
+                accumulator = 0.0
+                last_time = time.perf_counter()
+
+            # Whatever garbage the frame made is collected in the time left before the next one
+            gc.idle(frame_start + frame_time)
+            profiler.mark("gc")
+            self.clock.tick(hz)
+            profiler.mark("idle")
+            gc.end_frame()
+            profiler.count("allocs", gc.allocs)
+            profiler.count("alloc_kb", gc.alloc_bytes // 1024)
+            profiler.count("gc_pause_us", gc.pause_us)
+            profiler.count("gc_hitch_us", gc.unplanned_us)
+            profiler.end_frame()
+
+
+def main(argv=None):
+    Game(parser.parse_args(argv)).run()
+
+
+if __name__ == "__main__":
+    main()
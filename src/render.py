@@ -0,0 +1,336 @@
+import numpy as np
+import pygame
+
+from assets import assets
+from world import HEIGHT, TILE_SIZE, WIDTH, camera_x_at
+
+CHUNK_WIDTH = TILE_SIZE * 8
+
+# Render queue layers, drawn in ascending order
+LAYER_LEVEL = 0
+LAYER_ENEMIES = 1
+LAYER_ITEMS = 2
+LAYER_PLAYER = 3
+LAYER_PARTICLES = 4
+
+# DAMAGE EFFECTS
+shake_intensity = 8
+
+# Parallax layers, back to front: (image, tile area within it, scroll factor).
+# Each layer keeps only its tile at native resolution and repeats it over the
+# window, so memory does not depend on the level size.
+PARALLAX_LAYERS = [
+    # The wall art repeats every 864 px, so one period of it tiles seamlessly
+    ("background/map_Background_.png", (0, 0, 864, 480), 0.5),
+]
+
+# HUD layout
+HUD_POS = (10, 10)
+HUD_GAP = 6
+HUD_ROW_GAP = 8
+# Empty heart / key slots are the same icon multiplied down by this
+HUD_EMPTY_TINT = (90, 90, 90, 170)
+
+
+# ---------------- STATIC LEVEL LAYER ----------------
+# Platforms never move, so they are baked once into fixed-width vertical strips.
+# Each strip is trimmed to the rows that actually hold geometry, strips with no
+# transparent pixels are converted to plain opaque surfaces, and drawing only
+# touches the strips under the viewport. Only the strips over the span the
+# world has loaded are kept, and when the platform set changes only the strips
+# the added or removed platforms cross are rebaked, so a streamed level never
+# bakes more than the chunks around the camera.
+class StaticLayer:
+    def __init__(self, level_height):
+        self.level_height = level_height
+        self.chunks = {}
+        self.version = None
+        self.baked = set()
+        self.first = 0
+        self.last = -1
+
+    def sync(self, platforms, index, version, left, right):
+        # platforms / index are the world's platform group and spatial index,
+        # version its platforms_version and left / right the loaded span
+        first = left // CHUNK_WIDTH
+        last = (right - 1) // CHUNK_WIDTH
+        if version == self.version and first == self.first and last == self.last:
+            return
+
+        dirty = set()
+        if version != self.version:
+            self.version = version
+            current = set(platforms)
+            for platform in current.symmetric_difference(self.baked):
+                dirty.update(range(max(first, platform.rect.left // CHUNK_WIDTH),
+                                   min(last, (platform.rect.right - 1) // CHUNK_WIDTH) + 1))
+            self.baked = current
+        # Strips that scrolled out are dropped, ones that scrolled in baked
+        for col in [col for col in self.chunks if col < first or col > last]:
+            del self.chunks[col]
+        dirty.update(col for col in range(first, last + 1) if col < self.first or col > self.last)
+        self.first = first
+        self.last = last
+
+        can_convert = pygame.display.get_init() and pygame.display.get_surface() is not None
+        for col in dirty:
+            self.bake(col, index, can_convert)
+
+    def bake(self, col, index, can_convert):
+        area = pygame.Rect(col * CHUNK_WIDTH, 0, CHUNK_WIDTH, self.level_height)
+        members = [p for p in index.query(area) if p.rect.colliderect(area)]
+        self.chunks.pop(col, None)
+        if not members:
+            return
+        clipped = [p.rect.clip(area) for p in members]
+        bounds = clipped[0].unionall(clipped[1:])
+
+        surf = pygame.Surface(bounds.size, pygame.SRCALPHA)
+        surf.fill((0, 0, 0, 0))
+        for platform in members:
+            rect = platform.rect.move(-bounds.x, -bounds.y)
+            # Tiles stop at the platform edge, just like the old per-platform surface
+            surf.set_clip(rect.clip(surf.get_rect()))
+            for i in range(rect.left, rect.right, TILE_SIZE):
+                if i + TILE_SIZE <= 0 or i >= bounds.width:
+                    continue
+                for j in range(rect.top, rect.bottom, TILE_SIZE):
+                    surf.blit(platform.tile, (i, j))
+        surf.set_clip(None)
+
+        if can_convert:
+            opaque = pygame.mask.from_surface(surf, 254).count() == bounds.width * bounds.height
+            surf = surf.convert() if opaque else surf.convert_alpha()
+        self.chunks[col] = (surf, bounds.x, bounds.y)
+
+    def submit(self, queue, view):
+        # Queues the strips under the viewport
+        chunks = self.chunks
+        for col in range(view.left // CHUNK_WIDTH, view.right // CHUNK_WIDTH + 1):
+            chunk = chunks.get(col)
+            if chunk is not None:
+                queue.submit(*chunk, LAYER_LEVEL)
+
+
+# ---------------- PARALLAX ----------------
+class ParallaxLayer:
+    def __init__(self, path, area, factor):
+        self.tile = assets.tile(path, area, alpha=False)
+        self.factor = factor
+
+    def draw(self, surface, camera_x, camera_y):
+        # Blits just enough copies of the tile to cover the window; returns the count
+        tile_width, tile_height = self.tile.get_size()
+        width, height = surface.get_size()
+        start_x = -(int(camera_x * self.factor) % tile_width)
+        start_y = -(int(camera_y) % tile_height)
+        tile = self.tile
+        surface.blits([(tile, (x, y)) for x in range(start_x, width, tile_width)
+                       for y in range(start_y, height, tile_height)], False)
+        return len(range(start_x, width, tile_width)) * len(range(start_y, height, tile_height))
+
+
+# ---------------- RENDER QUEUE ----------------
+# Everything drawn in world space is submitted here as (surface, x, y, layer).
+# flush() walks the layers in order, shifts each layer's positions by the
+# camera in one NumPy operation and hands the whole layer to a single
+# blits() call (fblits() where the pygame build has it).
+class RenderQueue:
+    def __init__(self):
+        self.layers = {}
+        self.order = []
+
+    def layer(self, layer):
+        entries = self.layers.get(layer)
+        if entries is None:
+            entries = self.layers[layer] = ([], [], [])
+            self.order = sorted(self.layers)
+        return entries
+
+    def submit(self, surface, x, y, layer):
+        surfaces, xs, ys = self.layer(layer)
+        surfaces.append(surface)
+        xs.append(x)
+        ys.append(y)
+
+    def submit_many(self, surfaces, xs, ys, layer):
+        # xs / ys may be lists or NumPy arrays
+        layer_surfaces, layer_xs, layer_ys = self.layer(layer)
+        layer_surfaces.extend(surfaces)
+        layer_xs.extend(xs)
+        layer_ys.extend(ys)
+
+    def drain(self, offset_x, offset_y):
+        # Yields (surfaces, screen xs, screen ys) per non-empty layer in draw
+        # order, emptying each layer once the caller has drawn it
+        for layer in self.order:
+            surfaces, xs, ys = self.layers[layer]
+            if not surfaces:
+                continue
+            screen_x = (np.asarray(xs, np.int64) - int(offset_x)).tolist()
+            screen_y = (np.asarray(ys, np.int64) - int(offset_y)).tolist()
+            yield surfaces, screen_x, screen_y
+            surfaces.clear()
+            xs.clear()
+            ys.clear()
+
+    def flush(self, target, offset_x, offset_y):
+        # Draws and empties the queue; returns how many surfaces were blitted
+        blit = getattr(target, "fblits", None)
+        if blit is None:
+            blit = lambda sequence: target.blits(sequence, False)
+        count = 0
+        for surfaces, screen_x, screen_y in self.drain(offset_x, offset_y):
+            blit(zip(surfaces, zip(screen_x, screen_y)))
+            count += len(surfaces)
+        return count
+
+
+# ---------------- CULLING ----------------
+def visible_sprites(index, view):
+    # Sprites from a spatial index that overlap the viewport, in draw order
+    return [sprite for sprite in index.query(view) if view.colliderect(sprite.rect)]
+
+
+def submit_sprites(queue, sprites, layer):
+    for sprite in sprites:
+        queue.submit(sprite.image, sprite.rect.x, sprite.rect.y, layer)
+
+
+# ---------------- HUD ----------------
+# Hearts and keys are baked into one surface, which is only redrawn when the
+# health or key count changes; every other frame it is a single blit.
+class HudLayer:
+    def __init__(self, max_health, total_keys):
+        self.max_health = max_health
+        self.total_keys = total_keys
+        self.heart = assets.image("UI/heart_UI.png")
+        self.key = assets.image("UI/key_UI.png")
+        self.heart_empty = self.tinted(self.heart)
+        self.key_empty = self.tinted(self.key)
+
+        self.key_row = self.heart.get_height() + HUD_ROW_GAP
+        width = max(max_health * (self.heart.get_width() + HUD_GAP), total_keys * (self.key.get_width() + HUD_GAP))
+        self.surface = pygame.Surface((max(width, 1), self.key_row + self.key.get_height()), pygame.SRCALPHA)
+        self.state = None
+
+    def tinted(self, icon):
+        surface = icon.copy()
+        surface.fill(HUD_EMPTY_TINT, special_flags=pygame.BLEND_RGBA_MULT)
+        return surface
+
+    def render(self, health, collected):
+        surface = self.surface
+        surface.fill((0, 0, 0, 0))
+        step = self.heart.get_width() + HUD_GAP
+        for i in range(self.max_health):
+            surface.blit(self.heart if i < health else self.heart_empty, (i * step, 0))
+        step = self.key.get_width() + HUD_GAP
+        for i in range(self.total_keys):
+            surface.blit(self.key if i < collected else self.key_empty, (i * step, self.key_row))
+
+    def refresh(self, health, collected):
+        # Re-renders only when the state changed; returns True when it did
+        state = (health, collected)
+        if state == self.state:
+            return False
+        self.state = state
+        self.render(health, collected)
+        return True
+
+    def draw(self, target, health, collected):
+        # Returns True when the layer had to be redrawn this frame
+        redrawn = self.refresh(health, collected)
+        target.blit(self.surface, HUD_POS)
+        return redrawn
+
+
+# ---------------- WORLD RENDERER ----------------
+class WorldRenderer:
+    # Draws a World onto a surface; holds everything baked for that world
+    def __init__(self, screen, world):
+        self.screen = screen
+        self.world = world
+        self.static_layer = StaticLayer(world.level_height)
+        self.sync_static()
+        # Dungeon background
+        self.parallax = [ParallaxLayer(path, area, factor) for path, area, factor in PARALLAX_LAYERS]
+
+        self.queue = RenderQueue()
+        self.hud = HudLayer(world.player.max_health, world.total_keys)
+        self.flash_surface = assets.solid((WIDTH, HEIGHT), (255, 0, 0))
+
+        # Per-frame counters for the profiler; surfaces counts off-screen
+        # surfaces redrawn this frame, which is zero in steady state
+        self.blits = 0
+        self.surfaces = 0
+
+    def sync_static(self):
+        world = self.world
+        self.static_layer.sync(world.platforms, world.platform_index, world.platforms_version, *world.loaded_span())
+
+    def submit_enemies(self, view, alpha):
+        # One culling query over the enemy arrays, queued as a batch
+        enemies = self.world.enemies
+        rows = enemies.overlap(view)
+        if rows.size:
+            frames = enemies.frames
+            xs, ys = enemies.interpolated(rows, alpha)
+            self.queue.submit_many([frames[f] for f in enemies.frame_id[rows].tolist()],
+                                   xs.tolist(), ys.tolist(), LAYER_ENEMIES)
+
+    def submit_frame(self, alpha):
+        # Queues everything drawn in world space for this frame. alpha is how
+        # far the display is between the last two simulation ticks; moving
+        # things are drawn blended between them. Returns the background camera
+        # (which includes the shake) and the entity camera (which doesn't).
+        world = self.world
+        player = world.player
+        prev_x, prev_y = world.prev_player
+        player_x = round(prev_x + (player.rect.x - prev_x) * alpha)
+        player_y = round(prev_y + (player.rect.y - prev_y) * alpha)
+
+        shake_x = 0
+        shake_y = 0
+        if world.screen_shake > 0:
+            shake_x = world.fx_rng.randint(-shake_intensity, shake_intensity)
+            shake_y = world.fx_rng.randint(-shake_intensity//2, shake_intensity//2)
+        camera_x = camera_x_at(player_x + player.rect.width // 2, player.level_width) + shake_x
+        camera_y = 0 + shake_y
+
+        # Entities don't follow the shake, only the background does
+        offset_x = camera_x - shake_x
+        offset_y = camera_y - shake_y
+        view = pygame.Rect(offset_x, offset_y, WIDTH, HEIGHT)
+
+        queue = self.queue
+        self.sync_static()
+        self.static_layer.submit(queue, view)
+        self.submit_enemies(view, alpha)
+        submit_sprites(queue, visible_sprites(world.collectible_index, view), LAYER_ITEMS)
+        if view.colliderect(world.victory_block.rect):
+            submit_sprites(queue, (world.victory_block,), LAYER_ITEMS)
+        queue.submit(player.image, player_x, player_y, LAYER_PLAYER)
+        world.particles.submit(queue, view, LAYER_PARTICLES, alpha)
+        return camera_x, camera_y, offset_x, offset_y
+
+    def draw(self, alpha=1.0):
+        screen = self.screen
+        world = self.world
+        camera_x, camera_y, offset_x, offset_y = self.submit_frame(alpha)
+
+        # Parallax background
+        blits = 0
+        for layer in self.parallax:
+            blits += layer.draw(screen, camera_x, camera_y)
+
+        blits += self.queue.flush(screen, offset_x, offset_y)
+
+        if world.red_flash_alpha > 0:
+            self.flash_surface.set_alpha(int(world.red_flash_alpha))
+            screen.blit(self.flash_surface, (0, 0))
+            blits += 1
+
+        surfaces = 1 if self.hud.draw(screen, world.player.health, world.collected_count) else 0
+        self.blits = blits + 1
+        self.surfaces = surfaces
@@ -0,0 +1,170 @@
+import array
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+
+import pygame
+
+from level import load_level
+from world import Inputs, World
+
+# ---------------- INPUT SNAPSHOTS ----------------
+# One byte per tick: the four buttons plus a flag for "the world was reset
+# before this tick" (retry after game over / victory).
+LEFT, RIGHT, JUMP, ATTACK = 1, 2, 4, 8
+RESET = 0x80
+
+# Every possible button combination, prebuilt so playback never allocates Inputs
+INPUT_TABLE = [Inputs(bool(b & LEFT), bool(b & RIGHT), bool(b & JUMP), bool(b & ATTACK)) for b in range(16)]
+
+
+def pack_inputs(inputs):
+    return ((LEFT if inputs.left else 0) | (RIGHT if inputs.right else 0)
+            | (JUMP if inputs.jump else 0) | (ATTACK if inputs.attack else 0))
+
+
+# ---------------- FILE FORMAT ----------------
+# header | level path (utf-8) | zlib(input bytes) | per-tick u32 checksums
+MAGIC = b"KDRP"
+VERSION = 1
+HEADER = struct.Struct("<4sHHQIII")
+HAS_CHECKSUMS = 1
+
+
+class ReplayError(Exception):
+    pass
+
+
+class Replay:
+    def __init__(self, seed, level_path="", inputs=b"", checksums=None):
+        self.seed = seed
+        self.level_path = level_path
+        self.inputs = bytearray(inputs)
+        self.checksums = checksums
+
+    def __len__(self):
+        return len(self.inputs)
+
+    def save(self, path):
+        level = self.level_path.encode("utf-8")
+        body = zlib.compress(bytes(self.inputs), 9)
+        flags = HAS_CHECKSUMS if self.checksums is not None else 0
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, flags, self.seed, len(level), len(self.inputs), len(body)))
+            f.write(level)
+            f.write(body)
+            if self.checksums is not None:
+                f.write(self.checksums.tobytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise ReplayError(f"{path}: truncated header")
+        magic, version, flags, seed, level_len, ticks, body_len = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ReplayError(f"{path}: not a version {VERSION} replay")
+        offset = HEADER.size
+        level_path = data[offset:offset + level_len].decode("utf-8")
+        offset += level_len
+        inputs = zlib.decompress(data[offset:offset + body_len])
+        offset += body_len
+        if len(inputs) != ticks:
+            raise ReplayError(f"{path}: expected {ticks} ticks, found {len(inputs)}")
+        checksums = None
+        if flags & HAS_CHECKSUMS:
+            checksums = array.array("I")
+            checksums.frombytes(data[offset:offset + 4 * ticks])
+        return cls(seed, level_path, inputs, checksums)
+
+
+# ---------------- RECORDING ----------------
+class ReplayRecorder:
+    # Records what a world is fed, one tick at a time. Call record() right
+    # after world.step(inputs); resets are picked up from world.resets.
+    def __init__(self, world, level_path="", checksums=True):
+        self.world = world
+        self.replay = Replay(world.seed, level_path, checksums=array.array("I") if checksums else None)
+        self.seen_resets = world.resets
+
+    def record(self, inputs):
+        byte = pack_inputs(inputs)
+        # A reset since the last recorded tick is stamped on this one
+        if self.world.resets != self.seen_resets:
+            self.seen_resets = self.world.resets
+            byte |= RESET
+        self.replay.inputs.append(byte)
+        if self.replay.checksums is not None:
+            self.replay.checksums.append(self.world.checksum())
+
+    def save(self, path):
+        self.replay.save(path)
+
+
+# ---------------- PLAYBACK ----------------
+def play(replay, verify=True, world=None):
+    # Re-runs a replay headless as fast as possible.
+    # Returns (world, first mismatching tick or None); the caller closes the world.
+    if world is None:
+        level = load_level(replay.level_path) if replay.level_path else None
+        world = World(seed=replay.seed, level=level)
+    checksums = replay.checksums if verify else None
+    table = INPUT_TABLE
+    step = world.step
+    for tick, byte in enumerate(replay.inputs):
+        if byte & RESET:
+            world.reset()
+        step(table[byte & 0x0F])
+        if checksums is not None and world.checksum() != checksums[tick]:
+            return world, tick
+    return world, None
+
+
+def record_random(ticks, seed=0, level_path=""):
+    # Builds a replay from a random input policy, handy as a fixed benchmark run
+    world = World(seed=seed, level=load_level(level_path) if level_path else None)
+    recorder = ReplayRecorder(world, level_path)
+    rng = random.Random(seed)
+    try:
+        for _ in range(ticks):
+            if world.done:
+                world.reset()
+            inputs = Inputs(rng.random() < 0.3, rng.random() < 0.6, rng.random() < 0.05, rng.random() < 0.1)
+            world.step(inputs)
+            recorder.record(inputs)
+    finally:
+        world.close()
+    return recorder.replay
+
+
+if __name__ == "__main__":
+    # python replay.py play <file.kdr>
+    # python replay.py record <file.kdr> [ticks] [seed] [level]
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    if len(sys.argv) < 3 or sys.argv[1] not in ("play", "record"):
+        print("usage: python replay.py play <file.kdr> | record <file.kdr> [ticks] [seed] [level]")
+        sys.exit(1)
+    pygame.init()
+    if sys.argv[1] == "record":
+        ticks = int(sys.argv[3]) if len(sys.argv) > 3 else 60000
+        seed = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+        level_path = sys.argv[5] if len(sys.argv) > 5 else ""
+        replay = record_random(ticks, seed, level_path)
+        replay.save(sys.argv[2])
+        print(f"recorded {len(replay)} ticks to {sys.argv[2]} ({os.path.getsize(sys.argv[2])} bytes)")
+    else:
+        replay = Replay.load(sys.argv[2])
+        start = time.perf_counter()
+        world, mismatch = play(replay)
+        elapsed = time.perf_counter() - start
+        world.close()
+        print(f"{len(replay)} ticks in {elapsed:.3f}s ({len(replay) / elapsed:.0f} ticks/s)")
+        if mismatch is None:
+            print("checksums ok" if replay.checksums is not None else "no checksums recorded")
+        else:
+            print(f"desync at tick {mismatch}")
+            sys.exit(2)
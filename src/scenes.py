@@ -0,0 +1,148 @@
+import sys
+from collections import deque
+
+import pygame
+
+from world import FPS
+
+# How long an idle scene sleeps in event.wait before checking in again
+IDLE_WAIT_MS = 500
+
+
+# ---------------- TWEEN ----------------
+class Tween:
+    # Linear value over time, sampled from the clock instead of stepped with waits
+    def __init__(self, start, end, duration_ms):
+        self.start = start
+        self.end = end
+        self.duration_ms = duration_ms
+        self.start_time = pygame.time.get_ticks()
+
+    def progress(self):
+        if self.duration_ms <= 0:
+            return 1.0
+        return min(1.0, (pygame.time.get_ticks() - self.start_time) / self.duration_ms)
+
+    def value(self):
+        return self.start + (self.end - self.start) * self.progress()
+
+    @property
+    def done(self):
+        return self.progress() >= 1.0
+
+
+# ---------------- SCENE ----------------
+# A still screen: a background plus a few overlay surfaces. While nothing is
+# animating it sleeps in event.wait; when something changes only the dirty
+# rects are redrawn and pushed with the display's show(rects). Fades run as
+# tweens inside the same loop, so events keep being handled while they play,
+# and the display lays them over the frame. Work queued with when_idle() runs
+# one task per pass in the time the scene would otherwise sleep.
+class Scene:
+    def __init__(self, display, background, overlays=(), on_quit=None):
+        self.display = display
+        self.screen = display.surface
+        self.on_quit = on_quit
+        self.background = background
+        self.overlays = list(overlays)
+        self.keys = {}
+        self.fade = None
+        self.fade_color = None
+        self.on_fade_done = None
+        self.idle_tasks = deque()
+        self.dirty = [self.screen.get_rect()]
+        self.running = True
+        self.clock = pygame.time.Clock()
+
+    def on_key(self, key, callback):
+        self.keys[key] = callback
+
+    def when_idle(self, task):
+        self.idle_tasks.append(task)
+
+    def finish_idle(self):
+        # Runs whatever idle work the scene closed before getting to
+        while self.idle_tasks:
+            self.idle_tasks.popleft()()
+
+    def stop(self):
+        self.running = False
+
+    def invalidate(self, rect=None):
+        self.dirty.append(self.screen.get_rect() if rect is None else pygame.Rect(rect))
+
+    def set_overlays(self, overlays):
+        for surf, pos in self.overlays:
+            self.invalidate(surf.get_rect(topleft=pos))
+        self.overlays = list(overlays)
+        for surf, pos in self.overlays:
+            self.invalidate(surf.get_rect(topleft=pos))
+
+    def start_fade(self, color, start_alpha, end_alpha, duration_ms, on_done=None):
+        self.fade_color = color
+        self.fade = Tween(start_alpha, end_alpha, duration_ms)
+        self.on_fade_done = on_done
+
+    def draw_region(self, rect):
+        screen = self.screen
+        screen.blit(self.background, rect, rect)
+        for surf, pos in self.overlays:
+            area = surf.get_rect(topleft=pos).clip(rect)
+            if area.width and area.height:
+                screen.blit(surf, area, area.move(-pos[0], -pos[1]))
+
+    def handle_event(self, event):
+        if event.type == pygame.QUIT:
+            if self.on_quit is not None:
+                self.on_quit()
+            pygame.quit()
+            sys.exit()
+        if event.type == pygame.KEYDOWN:
+            callback = self.keys.get(event.key)
+            if callback is not None:
+                callback()
+        elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE, pygame.WINDOWRESTORED):
+            self.invalidate()
+
+    def run(self):
+        while self.running:
+            if self.fade is None and not self.dirty and self.idle_tasks:
+                # Nothing to animate: do a piece of queued work, then look at input
+                self.idle_tasks.popleft()()
+                events = pygame.event.get()
+            elif self.fade is None and not self.dirty:
+                # Nothing to animate or do: sleep until input arrives
+                events = [pygame.event.wait(IDLE_WAIT_MS)]
+                events.extend(pygame.event.get())
+            else:
+                events = pygame.event.get()
+            for event in events:
+                self.handle_event(event)
+
+            # A tween found finished is drawn at its end value, so its last
+            # frame always shows the full fade before on_fade_done runs
+            fade = None
+            finished = False
+            if self.fade is not None:
+                finished = self.fade.done
+                fade = (self.fade_color, int(self.fade.end if finished else self.fade.value()))
+                self.invalidate()
+
+            if self.dirty:
+                full = self.screen.get_rect()
+                rects = [full] if full in self.dirty else self.dirty
+                for rect in rects:
+                    self.draw_region(rect)
+                self.display.show(rects, fade)
+                self.dirty = []
+
+            if self.fade is not None:
+                if finished:
+                    # Dropped before calling it, so the scene doesn't keep a
+                    # reference cycle through its own bound method
+                    on_done, self.on_fade_done = self.on_fade_done, None
+                    self.fade = None
+                    if on_done is not None:
+                        on_done()
+                else:
+                    self.clock.tick(FPS)
@@ -0,0 +1,90 @@
+# ---------------- SPATIAL HASH ----------------
+# Uniform grid broadphase. Every item is filed under each cell its rect touches,
+# so a query only looks at the few cells around the rect it is given instead of
+# scanning the whole level.
+class SpatialHash:
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        # item -> (cell span, insertion order)
+        self.spans = {}
+        self.order = {}
+        self.next_order = 0
+
+    def __len__(self):
+        return len(self.spans)
+
+    def __contains__(self, item):
+        return item in self.spans
+
+    def cell_span(self, rect):
+        size = self.cell_size
+        return (rect.left // size, rect.top // size,
+                (rect.right - 1) // size, (rect.bottom - 1) // size)
+
+    def insert(self, item, rect=None):
+        rect = item.rect if rect is None else rect
+        span = self.cell_span(rect)
+        self.spans[item] = span
+        self.order[item] = self.next_order
+        self.next_order += 1
+        self.add_to_cells(item, span)
+
+    def remove(self, item):
+        span = self.spans.pop(item, None)
+        if span is None:
+            return
+        del self.order[item]
+        self.remove_from_cells(item, span)
+
+    def clear(self):
+        self.cells.clear()
+        self.spans.clear()
+        self.order.clear()
+        self.next_order = 0
+
+    def query(self, rect):
+        # Broadphase candidates sharing a cell with rect, in insertion order.
+        # Callers still do their own exact rect test.
+        x0, y0, x1, y1 = self.cell_span(rect)
+        cells = self.cells
+        if x0 == x1 and y0 == y1:
+            found = cells.get((x0, y0))
+            if not found:
+                return []
+            if len(found) > 1:
+                return sorted(found, key=self.order.__getitem__)
+            return list(found)
+
+        found = {}
+        get = cells.get
+        rows = range(y0, y1 + 1)
+        for cx in range(x0, x1 + 1):
+            for cy in rows:
+                bucket = get((cx, cy))
+                if bucket:
+                    found.update(bucket)
+        if len(found) > 1:
+            return sorted(found, key=self.order.__getitem__)
+        return list(found)
+
+    def add_to_cells(self, item, span):
+        x0, y0, x1, y1 = span
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    bucket = cells[(cx, cy)] = {}
+                bucket[item] = None
+
+    def remove_from_cells(self, item, span):
+        x0, y0, x1, y1 = span
+        cells = self.cells
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is not None:
+                    bucket.pop(item, None)
+                    if not bucket:
+                        del cells[(cx, cy)]
@@ -0,0 +1,272 @@
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from level import load_level
+from replay import INPUT_TABLE
+from world import HEIGHT, WIDTH, World
+
+# ---------------- OBSERVATIONS ----------------
+# One float32 row per world: player state, then the gate, the nearest key and
+# the NEAREST_ENEMIES closest enemies relative to the player (zero padded).
+NEAREST_ENEMIES = 4
+PLAYER_FEATURES = 10
+OBS_SIZE = PLAYER_FEATURES + 2 + 2 + NEAREST_ENEMIES * 3
+
+# Actions are the replay input byte: LEFT=1, RIGHT=2, JUMP=4, ATTACK=8
+NUM_ACTIONS = len(INPUT_TABLE)
+
+# ---------------- REWARDS ----------------
+KEY_REWARD = 1.0
+KILL_REWARD = 0.5
+DAMAGE_PENALTY = -1.0
+VICTORY_REWARD = 10.0
+DEATH_PENALTY = -5.0
+# Per pixel of rightward progress, so an agent has something to follow early on
+PROGRESS_REWARD = 0.001
+
+# Episodes that neither win nor die are cut off after this many ticks
+MAX_TICKS = 60 * 120
+
+
+def observe(world, out):
+    player = world.player
+    rect = player.rect
+    out[:PLAYER_FEATURES] = (
+        rect.centerx / world.level_width, rect.centery / world.level_height, player.vel_y / 15.0,
+        player.health / player.max_health, player.on_ground, player.jump_count / 2.0,
+        player.invincible, player.is_attacking, player.direction,
+        world.collected_count / world.total_keys if world.total_keys else 1.0,
+    )
+    i = PLAYER_FEATURES
+    gate = world.victory_block.rect
+    out[i:i + 2] = ((gate.centerx - rect.centerx) / WIDTH, (gate.centery - rect.centery) / HEIGHT)
+    i += 2
+
+    nearest = None
+    for key in world.collectibles:
+        dx = key.rect.centerx - rect.centerx
+        if nearest is None or abs(dx) < abs(nearest[0]):
+            nearest = (dx, key.rect.centery - rect.centery)
+    out[i:i + 2] = (nearest[0] / WIDTH, nearest[1] / HEIGHT) if nearest is not None else (0.0, 0.0)
+    i += 2
+
+    out[i:] = 0.0
+    enemies = world.enemies
+    n = len(enemies)
+    if n:
+        dx = enemies.x[:n] + enemies.width // 2 - rect.centerx
+        dy = enemies.y[:n] + enemies.height // 2 - rect.centery
+        rows = np.argsort(np.abs(dx), kind="stable")[:NEAREST_ENEMIES]
+        k = len(rows)
+        features = out[i:i + k * 3].reshape(k, 3)
+        features[:, 0] = dx[rows] / WIDTH
+        features[:, 1] = dy[rows] / HEIGHT
+        features[:, 2] = enemies.direction[rows]
+
+
+# ---------------- ENVIRONMENT ----------------
+class Env:
+    # One world plus the bookkeeping needed to turn its state changes into rewards
+    def __init__(self, seed, level_path="", max_ticks=MAX_TICKS):
+        self.world = World(seed=seed, level=load_level(level_path) if level_path else None)
+        self.max_ticks = max_ticks
+        self.snapshot()
+
+    def snapshot(self):
+        world = self.world
+        self.keys = world.collected_count
+        self.kills = len(world.killed_ids)
+        self.health = world.player.health
+        self.x = world.player.rect.x
+
+    def close(self):
+        self.world.close()
+
+    def reset(self, out):
+        self.world.reset()
+        self.snapshot()
+        observe(self.world, out)
+
+    def step(self, action, out):
+        # Returns (reward, done); a finished episode is reset straight away and
+        # out holds the first observation of the next one
+        world = self.world
+        world.step(INPUT_TABLE[action])
+        player = world.player
+        reward = (KEY_REWARD * (world.collected_count - self.keys)
+                  + KILL_REWARD * (len(world.killed_ids) - self.kills)
+                  + PROGRESS_REWARD * (player.rect.x - self.x))
+        if player.health < self.health:
+            reward += DAMAGE_PENALTY * (self.health - player.health)
+        if world.victory:
+            reward += VICTORY_REWARD
+        elif world.game_over:
+            reward += DEATH_PENALTY
+
+        done = world.done or world.tick >= self.max_ticks
+        if done:
+            self.reset(out)
+        else:
+            self.snapshot()
+            observe(world, out)
+        return reward, done
+
+
+# ---------------- SHARED BUFFERS ----------------
+BUFFERS = (
+    ("actions", np.uint8, ()),
+    ("obs", np.float32, (OBS_SIZE,)),
+    ("rewards", np.float32, ()),
+    ("dones", np.bool_, ()),
+)
+
+
+def attach_buffers(names, num_envs):
+    # name -> (SharedMemory, array view); the arrays are indexed by env
+    buffers = {}
+    for (field, dtype, shape), name in zip(BUFFERS, names):
+        shm = shared_memory.SharedMemory(name=name)
+        buffers[field] = (shm, np.ndarray((num_envs,) + shape, dtype, shm.buf))
+    return buffers
+
+
+def worker(conn, names, num_envs, first, count, seed, level_path, max_ticks):
+    # Runs envs [first, first + count) and answers "reset" / "step" / "close".
+    # Only those short command strings cross the pipe; all data goes through
+    # the shared buffers.
+    pygame.init()
+    buffers = attach_buffers(names, num_envs)
+    actions = buffers["actions"][1]
+    obs = buffers["obs"][1]
+    rewards = buffers["rewards"][1]
+    dones = buffers["dones"][1]
+    envs = [Env(seed + first + i, level_path, max_ticks) for i in range(count)]
+    rows = range(first, first + count)
+    try:
+        while True:
+            command = conn.recv()
+            if command == "step":
+                for env, row in zip(envs, rows):
+                    rewards[row], dones[row] = env.step(actions[row], obs[row])
+            elif command == "reset":
+                for env, row in zip(envs, rows):
+                    env.reset(obs[row])
+                    rewards[row] = 0.0
+                    dones[row] = False
+            elif command == "close":
+                break
+            conn.send(command)
+    finally:
+        for env in envs:
+            env.close()
+        del actions, obs, rewards, dones
+        for shm, _ in buffers.values():
+            shm.close()
+        conn.close()
+
+
+# ---------------- VECTORIZED ENVIRONMENT ----------------
+# N independent headless worlds split across a pool of worker processes.
+# Actions, observations, rewards and done flags live in shared memory, so a
+# step costs one small message per worker regardless of N.
+class VecEnv:
+    def __init__(self, num_envs, workers=None, seed=0, level_path="", max_ticks=MAX_TICKS):
+        self.num_envs = num_envs
+        workers = min(num_envs, workers or os.cpu_count() or 1)
+
+        self.shms = []
+        for field, dtype, shape in BUFFERS:
+            size = max(1, num_envs * int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize)
+            shm = shared_memory.SharedMemory(create=True, size=size)
+            self.shms.append(shm)
+            setattr(self, field, np.ndarray((num_envs,) + shape, dtype, shm.buf))
+        names = [shm.name for shm in self.shms]
+
+        # Spawned rather than forked, so workers never inherit a display
+        context = multiprocessing.get_context("spawn")
+        self.conns = []
+        self.processes = []
+        per_worker, extra = divmod(num_envs, workers)
+        first = 0
+        for w in range(workers):
+            count = per_worker + (1 if w < extra else 0)
+            parent, child = context.Pipe()
+            process = context.Process(target=worker, daemon=True,
+                                      args=(child, names, num_envs, first, count, seed, level_path, max_ticks))
+            process.start()
+            child.close()
+            self.conns.append(parent)
+            self.processes.append(process)
+            first += count
+        self.closed = False
+
+    def broadcast(self, command):
+        for conn in self.conns:
+            conn.send(command)
+        for conn in self.conns:
+            conn.recv()
+
+    def reset(self):
+        self.broadcast("reset")
+        return self.obs.copy()
+
+    def step(self, actions):
+        # actions: N action bytes -> (obs, rewards, dones), each indexed by env.
+        # Finished envs are reset automatically; their obs row starts the next episode.
+        self.actions[:] = actions
+        self.broadcast("step")
+        return self.obs.copy(), self.rewards.copy(), self.dones.copy()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            for conn in self.conns:
+                # A worker that already died has closed its end
+                try:
+                    conn.send("close")
+                except (BrokenPipeError, EOFError):
+                    pass
+                conn.close()
+            for process in self.processes:
+                process.join()
+        finally:
+            del self.actions, self.obs, self.rewards, self.dones
+            for shm in self.shms:
+                shm.close()
+                shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    # Throughput check: python vecenv.py [envs] [workers] [steps] [level]
+    num_envs = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    steps = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    level_path = sys.argv[4] if len(sys.argv) > 4 else ""
+    rng = np.random.default_rng(0)
+    with VecEnv(num_envs, workers, level_path=level_path) as env:
+        env.reset()
+        start = time.perf_counter()
+        episodes = 0
+        for _ in range(steps):
+            _, _, dones = env.step(rng.integers(0, NUM_ACTIONS, num_envs, dtype=np.uint8))
+            episodes += int(dones.sum())
+        elapsed = time.perf_counter() - start
+    print(f"{num_envs} envs x {steps} steps on {len(env.processes)} workers in {elapsed:.2f}s "
+          f"({num_envs * steps / elapsed:.0f} env steps/s, {episodes} episodes finished)")
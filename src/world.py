@@ -0,0 +1,823 @@
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+from array import array
+from collections import deque, namedtuple
+
+import numpy as np
+import pygame
+
+from animation import animations
+from assets import assets
+from enemies import SLEEPER, EnemyBatch
+from level import LevelStream, load_level
+from nav import NavGraph
+from particles import ParticleSystem
+from spatial import SpatialHash
+
+# Window size
+WIDTH, HEIGHT = 800, 480
+FPS = 60
+
+# Streamed levels keep chunks loaded this far past either edge of the camera
+STREAM_MARGIN = WIDTH
+
+# Patrolling enemies whose whole patrol stays this far past either edge of the
+# camera sleep
+ACTIVE_MARGIN = WIDTH // 2
+# Activation runs every this many ticks; the camera can't cross the margin in
+# that time, so nothing sleeps while it could be seen
+ACTIVATION_INTERVAL = 8
+
+TILE_SIZE = 40
+GRAVITY = 0.7
+
+# DAMAGE EFFECTS
+RED_FLASH_MAX = 140
+
+# The sword swing's reach in front of the player
+ATTACK_SIZE = (50, 40)
+
+# ---------------- INPUT ----------------
+# One tick worth of player input, so the simulation never polls the keyboard itself
+Inputs = namedtuple("Inputs", ["left", "right", "jump", "attack"], defaults=(False, False, False, False))
+NO_INPUT = Inputs()
+
+
+def read_inputs():
+    keys = pygame.key.get_pressed()
+    return Inputs(keys[pygame.K_LEFT], keys[pygame.K_RIGHT], keys[pygame.K_SPACE], keys[pygame.K_x])
+
+
+# ---------------- ATLAS SPRITE ----------------
+class AtlasSprite(pygame.sprite.Sprite):
+    # Sprite whose image is a frame of the shared atlas, tracked by id
+    frames = ()
+    frame_id = 0
+
+    def set_frame(self, frame_id):
+        self.frame_id = frame_id
+        self.image = self.frames[frame_id]
+
+
+# ---------------- PLAYER ----------------
+# Every mutable Player field, in the order pack() writes them
+PLAYER_SNAPSHOT = struct.Struct("<iid?i?i?iii?iii?ii")
+
+# Player animation states, highest priority first: attacking, airborne,
+# moving, otherwise idle. Those three flags form a 3-bit key and
+# PLAYER_STATE_TABLE maps every key to the state that plays.
+PLAYER_ANIMATIONS = ("player_attack", "player_jump", "player_walk", "player_idle")
+PLAYER_STATE_TABLE = tuple(next((bit for bit in range(3) if key >> bit & 1), 3) for key in range(8))
+
+
+class Player(AtlasSprite):
+    def __init__(self, x, y, level_width):
+        super().__init__()
+        self.level_width = level_width
+
+        # Sprite frames are atlas ids, so several players never reload or flip anything
+        assets.load_sprite_clips()
+        self.frames = assets.frames
+        self.animations = [animations.get(name, FPS) for name in PLAYER_ANIMATIONS]
+
+        # Initial state
+        self.set_frame(self.animations[-1].frame(0))
+        self.rect = self.image.get_rect(topleft=(x, y))
+
+        # Movement
+        self.vel_y = 0
+        self.speed = 5
+        self.jump_power = -15
+        self.on_ground = False
+        self.jump_count = 0
+        self.space_was_pressed = False
+
+        # Health
+        self.max_health = 3
+        self.health = self.max_health
+
+        # Attack; it lasts as long as its animation
+        self.is_attacking = False
+
+        # Animation: the playing state and ticks since it started
+        self.anim_state = len(PLAYER_ANIMATIONS) - 1
+        self.anim_tick = 0
+        self.direction = 1
+
+        # Invincibility/knockback
+        self.invincible = False
+        self.invincible_timer = 0
+        self.knockback_timer = 0
+        self.knockback_dir = 0
+
+        # Death
+        self.dead = False
+        self.death_timer = 0
+
+    def handle_input(self, inputs):
+        if self.dead:
+            return
+
+        # Horizontal movement
+        if self.knockback_timer <= 0:
+            if inputs.left:
+                self.rect.x -= self.speed
+                self.direction = -1
+            if inputs.right:
+                self.rect.x += self.speed
+                self.direction = 1
+        else:
+            self.rect.x += 10 * self.knockback_dir
+
+        # Jumping / double jump
+        space_pressed = inputs.jump
+        if space_pressed and not self.space_was_pressed:
+            if self.on_ground:
+                self.vel_y = self.jump_power
+                self.on_ground = False
+                self.jump_count = 1
+            elif self.jump_count == 1:
+                self.vel_y = self.jump_power
+                self.jump_count = 2
+        self.space_was_pressed = space_pressed
+
+        # Attacking
+        if inputs.attack and not self.is_attacking:
+            self.is_attacking = True
+
+    # ---------------- SNAPSHOT ----------------
+    def pack(self):
+        rect = self.rect
+        return PLAYER_SNAPSHOT.pack(
+            rect.x, rect.y, self.vel_y, self.on_ground, self.jump_count, self.space_was_pressed, self.health,
+            self.is_attacking, self.anim_state, self.anim_tick, self.direction,
+            self.invincible, self.invincible_timer, self.knockback_timer, self.knockback_dir, self.dead,
+            self.death_timer, self.frame_id,
+        )
+
+    def unpack(self, data, offset):
+        (self.rect.x, self.rect.y, self.vel_y, self.on_ground, self.jump_count, self.space_was_pressed, self.health,
+         self.is_attacking, self.anim_state, self.anim_tick, self.direction,
+         self.invincible, self.invincible_timer, self.knockback_timer, self.knockback_dir, self.dead,
+         self.death_timer, frame_id) = PLAYER_SNAPSHOT.unpack_from(data, offset)
+        self.set_frame(frame_id)
+        return offset + PLAYER_SNAPSHOT.size
+
+    def take_damage(self, source_x):
+        # Returns True when the hit landed so the world can trigger its effects
+        if self.invincible or self.dead:
+            return False
+        self.health -= 1
+        self.invincible = True
+        self.invincible_timer = 90
+        self.knockback_dir = -1 if source_x > self.rect.centerx else 1
+        self.knockback_timer = 18
+        if self.health <= 0:
+            self.dead = True
+            self.death_timer = 60
+        return True
+
+    def apply_gravity(self):
+        self.vel_y += GRAVITY
+        self.rect.y += self.vel_y
+
+    def update(self, platform_index, inputs=NO_INPUT):
+        # Invincibility timer
+        if self.invincible:
+            self.invincible_timer -= 1
+            if self.invincible_timer <= 0:
+                self.invincible = False
+
+        if self.knockback_timer > 0:
+            self.knockback_timer -= 1
+
+        # Dead state
+        if self.dead:
+            self.rect.y += 1.0
+            self.death_timer -= 1
+            return
+
+        # Update movement
+        prev_bottom = self.rect.bottom
+        self.handle_input(inputs)
+        self.apply_gravity()
+        self.on_ground = False
+
+        # Swept platform collision: land on the highest top the feet crossed
+        # this tick, so no fall speed can carry the player through a platform
+        if self.vel_y >= 0:
+            rect = self.rect
+            sweep = pygame.Rect(rect.left, prev_bottom, rect.width, rect.bottom - prev_bottom + 1)
+            landing = None
+            for platform in platform_index.query(sweep):
+                top = platform.rect.top
+                if (prev_bottom <= top <= rect.bottom and platform.rect.left < rect.right
+                        and platform.rect.right > rect.left and (landing is None or top < landing)):
+                    landing = top
+            if landing is not None:
+                rect.bottom = landing
+                self.vel_y = 0
+                self.on_ground = True
+                self.jump_count = 0
+
+        # Boundaries
+        if self.rect.left < 0:
+            self.rect.left = 0
+        if self.rect.right > self.level_width:
+            self.rect.right = self.level_width
+
+        self.animate(inputs.left or inputs.right)
+
+    def animate(self, moving):
+        # Entering a new state restarts its animation; the attack ends when
+        # its animation has played through, handing over in the same tick
+        state = PLAYER_STATE_TABLE[self.is_attacking | (not self.on_ground) << 1 | moving << 2]
+        if state != self.anim_state:
+            self.anim_state = state
+            self.anim_tick = 0
+        animation = self.animations[state]
+        if animation.done(self.anim_tick):
+            self.is_attacking = False
+            self.animate(moving)
+            return
+        self.set_frame(animation.frame(self.anim_tick, self.direction != 1))
+        self.anim_tick = animation.advance(self.anim_tick)
+
+
+# ---------------- PLATFORM ----------------
+class Platform(pygame.sprite.Sprite):
+    def __init__(self, x, y, w, h, tile_surface):
+        super().__init__()
+        # Platforms are pure geometry; the renderer bakes their tiles into the static layer
+        self.tile = tile_surface
+        self.rect = pygame.Rect(x, y, w, h)
+
+
+# ---------------- COLLECTIBLE ----------------
+class Collectible(AtlasSprite):
+    def __init__(self, x, y):
+        super().__init__()
+        assets.load_sprite_clips()
+        self.frames = assets.frames
+        self.set_frame(assets.clip("key")[0])
+        self.rect = self.image.get_rect(topleft=(x, y))
+
+
+# ---------------- VICTORY BLOCK ----------------
+class VictoryBlock(AtlasSprite):
+    def __init__(self, x, y):
+        super().__init__()
+        # Victory gate sprite
+        assets.load_sprite_clips()
+        self.frames = assets.frames
+        self.set_frame(assets.clip("gate")[0])
+        self.rect = self.image.get_rect(topleft=(x, y))
+
+
+# ---------------- CAMERA ----------------
+def camera_x_at(centerx, level_width):
+    return max(0, min(centerx - WIDTH // 2, level_width - WIDTH))
+
+
+def get_camera_offset(player, shake_x=0, shake_y=0):
+    return camera_x_at(player.rect.centerx, player.level_width) + shake_x, 0 + shake_y
+
+
+# ---------------- WORLD ----------------
+PLAYER_STATE = struct.Struct("<iiidiiiiii??iiI")
+
+# Snapshot header: tick, keys collected, shake, red flash, game over, victory,
+# interpolation origin, nav goal (-1 for none), then the number of enemies,
+# particles, killed ids, collected ids, loaded chunks and sleepers
+WORLD_SNAPSHOT = struct.Struct("<Iiii??iiiIIIIII")
+# How many ticks a Rollback can rewind
+ROLLBACK_FRAMES = 120
+
+
+class World:
+    # Owns every piece of gameplay state and advances it one tick per step().
+    # Nothing in here touches the display, so it runs the same with or without a window.
+    def __init__(self, seed=None, level=None, chase=None, active_margin=ACTIVE_MARGIN):
+        # Every random draw comes from streams derived from one seed, so a run
+        # is fully reproducible from (seed, level, inputs)
+        self.seed = seed if seed is not None else random.randrange(1 << 32)
+        self.rng = random.Random(self.seed)
+        self.fx_rng = random.Random(self.rng.getrandbits(32))
+        self.level = level if level is not None else load_level()
+        self.level_width = self.level.width
+        self.level_height = self.level.height
+        self.streaming = isinstance(self.level, LevelStream)
+
+        # Load platform
+        try:
+            self.platform_tile = assets.scaled("platforms/platform_Block.png", (TILE_SIZE, TILE_SIZE))
+        except Exception as e:
+            print("Warning: couldn't load platform tile - using fallback. Error:", e)
+            self.platform_tile = pygame.Surface((TILE_SIZE, TILE_SIZE))
+            self.platform_tile.fill((120, 80, 40))
+
+        # Static platforms go into the grid once; enemies and keys are refiled on reset
+        self.platforms = pygame.sprite.Group()
+        self.platform_index = SpatialHash(TILE_SIZE)
+        # Bumped whenever the platform set changes, so renderers know to rebake
+        self.platforms_version = 0
+        if not self.streaming:
+            for x, y, w, h in self.level.platforms:
+                self.add_platform(x, y, w, h)
+
+        self.victory_block = VictoryBlock(*self.level.victory)
+        self.player = Player(*self.level.player_start, self.level_width)
+        # Enemies live in one batch of arrays rather than as sprites
+        self.enemies = EnemyBatch(FPS)
+        self.collectibles = pygame.sprite.Group()
+        self.collectible_index = SpatialHash(TILE_SIZE)
+        self.total_keys = self.level.key_count
+        # Every pixel of the swing counts, so its mask is solid
+        self.attack_range = pygame.Rect((0, 0), ATTACK_SIZE)
+        self.attack_mask = pygame.mask.Mask(ATTACK_SIZE, fill=True)
+        self.particles = ParticleSystem(seed=self.rng.getrandbits(32))
+
+        # Chasing enemies path over a nav graph of the platforms, rebuilt
+        # whenever the platform set changes
+        self.chase = self.level.chase if chase is None else chase
+        self.nav = None
+        self.nav_version = -1
+
+        # Enemies far from the camera leave the batch and sleep until it nears
+        # them (None keeps every enemy awake). Sleepers fill the first
+        # sleeper_count rows of a SLEEPER array, so snapshots copy it whole.
+        self.active_margin = active_margin
+        self.sleepers = np.zeros(64, SLEEPER)
+        self.sleeper_count = 0
+
+        # Streaming bookkeeping: chunk -> what it spawned, plus what is already gone for good
+        self.loaded_chunks = {}
+        self.platform_refs = {}
+        self.killed_ids = set()
+        self.collected_ids = set()
+        self.resets = 0
+        # Names of what happened during the last step ("jump", "attack", "hit",
+        # "key", "gate"), for the audio and anything else that reacts to gameplay
+        self.events = []
+        # Optional FrameProfiler; step() charges its phases to it when set
+        self.profiler = None
+        # The first reset builds the starting state; every later one restores it
+        self.start_state = None
+        self.reset()
+
+    def reset(self):
+        self.resets += 1
+        if self.start_state is not None:
+            self.restore(self.start_state)
+            return
+        self.spawn_start()
+        self.start_state = self.snapshot()
+
+    def spawn_start(self):
+        player = self.player
+        player.rect.topleft = self.level.player_start
+        player.health = player.max_health
+        player.vel_y = 0
+        player.jump_count = 0
+        player.invincible = False
+        player.invincible_timer = 0
+        player.knockback_timer = 0
+        player.dead = False
+        player.death_timer = 0
+        player.is_attacking = False
+
+        self.enemies.clear()
+        self.sleeper_count = 0
+        if self.nav is not None:
+            self.nav.set_goal(None)
+        self.collectibles.empty()
+        self.collectible_index.clear()
+        if self.streaming:
+            for col in list(self.loaded_chunks):
+                self.unload_chunk(col)
+            self.killed_ids.clear()
+            self.collected_ids.clear()
+            self.update_stream()
+        else:
+            for spawn_id, (x, y, patrol_width, speed) in enumerate(self.level.enemies):
+                self.add_enemy(spawn_id, x, y, patrol_width, speed)
+            for key_id, (x, y) in enumerate(self.level.keys):
+                self.add_collectible(key_id, x, y)
+
+        self.prev_player = player.rect.topleft
+        self.collected_count = 0
+        self.particles.clear()
+        self.screen_shake = 0
+        self.red_flash_alpha = 0
+        self.tick = 0
+
+        self.game_over = False
+        self.victory = False
+
+    # ---------------- SPAWNING ----------------
+    def add_platform(self, x, y, w, h):
+        platform = Platform(x, y, w, h, self.platform_tile)
+        self.platforms.add(platform)
+        self.platform_index.insert(platform)
+        self.platforms_version += 1
+        return platform
+
+    def remove_platform(self, platform):
+        platform.kill()
+        self.platform_index.remove(platform)
+        self.platforms_version += 1
+
+    def add_enemy(self, spawn_id, x, y, patrol_width, speed):
+        return self.enemies.add(spawn_id, x, y, patrol_width, speed)
+
+    def add_collectible(self, key_id, x, y):
+        collectible = Collectible(x, y)
+        collectible.key_id = key_id
+        self.collectibles.add(collectible)
+        self.collectible_index.insert(collectible)
+        return collectible
+
+    # ---------------- ACTIVATION ----------------
+    def add_sleepers(self, sleepers):
+        n = self.sleeper_count
+        k = len(sleepers)
+        if n + k > len(self.sleepers):
+            grown = np.zeros(max(len(self.sleepers) * 2, n + k), SLEEPER)
+            grown[:n] = self.sleepers[:n]
+            self.sleepers = grown
+        self.sleepers[n:n + k] = sleepers
+        self.sleeper_count = n + k
+
+    def take_sleepers(self, mask):
+        # Removes the sleepers where mask is set and returns them. Like the
+        # enemy batch, the rows past the new end fill the holes, so only as
+        # many records move as were taken.
+        sleepers = self.sleepers
+        taken = sleepers[:self.sleeper_count][mask]
+        live = self.sleeper_count - len(taken)
+        holes = np.flatnonzero(mask[:live])
+        movers = np.flatnonzero(~mask[live:]) + live
+        sleepers[holes] = sleepers[movers]
+        self.sleeper_count = live
+        return taken
+
+    def update_activation(self):
+        # Wakes the sleepers whose patrol reaches into the active region and
+        # puts awake patrollers entirely outside it to sleep. Every sleeper is
+        # tested each time, in one vectorized pass, so however far the camera
+        # jumped between calls nobody inside the region stays asleep.
+        camera_x, _ = get_camera_offset(self.player)
+        left = camera_x - self.active_margin
+        right = camera_x + WIDTH + self.active_margin
+
+        if self.sleeper_count:
+            live = self.sleepers[:self.sleeper_count]
+            near = (live["right"] > left) & (live["left"] < right)
+            if near.any():
+                woken = self.take_sleepers(near)
+                self.enemies.wake(woken[np.argsort(woken["spawn_id"], kind="stable")], self.tick)
+
+        rows = self.enemies.sleepy(left, right)
+        if rows.size:
+            self.add_sleepers(self.enemies.sleep(rows, self.tick))
+
+    # ---------------- STREAMING ----------------
+    def update_stream(self):
+        # Keep only the chunks around the camera decoded and instantiated
+        level = self.level
+        camera_x, _ = get_camera_offset(self.player)
+        first = max(0, int(camera_x - STREAM_MARGIN) // level.chunk_width)
+        last = min(level.chunk_count - 1, int(camera_x + WIDTH + STREAM_MARGIN) // level.chunk_width)
+        for col in list(self.loaded_chunks):
+            if col < first or col > last:
+                self.unload_chunk(col)
+        for col in range(first, last + 1):
+            if col not in self.loaded_chunks:
+                self.load_chunk(col)
+
+    def loaded_span(self):
+        # The x range (left, right) whose platforms are instantiated
+        if not self.streaming:
+            return 0, self.level_width
+        if not self.loaded_chunks:
+            return 0, 0
+        chunk_width = self.level.chunk_width
+        return min(self.loaded_chunks) * chunk_width, (max(self.loaded_chunks) + 1) * chunk_width
+
+    def load_chunk(self, col):
+        platforms, enemies, keys = self.level.read_chunk(col)
+        platform_ids = []
+        for platform_id, x, y, w, h in platforms:
+            ref = self.platform_refs.get(platform_id)
+            if ref is None:
+                self.platform_refs[platform_id] = [self.add_platform(x, y, w, h), 1]
+            else:
+                ref[1] += 1
+            platform_ids.append(platform_id)
+        spawn_ids = []
+        for spawn_id, x, y, patrol_width, speed in enemies:
+            if spawn_id not in self.killed_ids:
+                self.add_enemy(spawn_id, x, y, patrol_width, speed)
+                spawn_ids.append(spawn_id)
+        collectibles = [self.add_collectible(key_id, x, y)
+                        for key_id, x, y in keys if key_id not in self.collected_ids]
+        self.loaded_chunks[col] = (platform_ids, spawn_ids, collectibles)
+
+    def unload_chunk(self, col):
+        platform_ids, spawn_ids, collectibles = self.loaded_chunks.pop(col)
+        for platform_id in platform_ids:
+            ref = self.platform_refs[platform_id]
+            ref[1] -= 1
+            if ref[1] == 0:
+                self.remove_platform(ref[0])
+                del self.platform_refs[platform_id]
+        self.enemies.remove_spawns(spawn_ids)
+        if self.sleeper_count and len(spawn_ids):
+            self.take_sleepers(np.isin(self.sleepers[:self.sleeper_count]["spawn_id"], spawn_ids))
+        for collectible in collectibles:
+            collectible.kill()
+            self.collectible_index.remove(collectible)
+
+    # ---------------- SNAPSHOTS ----------------
+    # The whole gameplay state packed into one bytes object: plain numbers and
+    # the enemy / particle arrays, never sprites or surfaces. Restoring one is
+    # cheap enough to do every tick, which is what retry, checkpoints and
+    # Rollback build on. Sprites (keys, streamed platforms) are re-derived from
+    # the level data and the collected ids.
+    def snapshot(self):
+        player = self.player
+        enemies = self.enemies
+        goal = self.nav.goal if self.nav is not None else None
+        # Id lists are written sorted, so the same state always packs to the
+        # same bytes however it was reached
+        chunks = array("i", sorted(self.loaded_chunks))
+        killed = array("q", sorted(self.killed_ids))
+        collected = array("q", sorted(self.collected_ids))
+        header = WORLD_SNAPSHOT.pack(
+            self.tick, self.collected_count, self.screen_shake, self.red_flash_alpha,
+            self.game_over, self.victory, self.prev_player[0], self.prev_player[1], -1 if goal is None else goal,
+            len(enemies), len(self.particles), len(killed), len(collected), len(chunks), self.sleeper_count,
+        )
+        return b"".join((header, player.pack(), enemies.pack(), self.particles.pack(),
+                         killed.tobytes(), collected.tobytes(), chunks.tobytes(),
+                         self.sleepers[:self.sleeper_count].tobytes()))
+
+    def restore(self, data):
+        (self.tick, self.collected_count, self.screen_shake, self.red_flash_alpha,
+         self.game_over, self.victory, prev_x, prev_y, goal,
+         enemy_count, particle_count, killed_count, collected_count, chunk_count,
+         sleeper_count) = WORLD_SNAPSHOT.unpack_from(data)
+        self.prev_player = (prev_x, prev_y)
+        offset = self.player.unpack(data, WORLD_SNAPSHOT.size)
+        enemies_at = offset
+        offset += enemy_count * sum(a.itemsize for a in self.enemies.arrays)
+        offset = self.particles.unpack(data, offset, particle_count)
+
+        killed = array("q")
+        killed.frombytes(data[offset:offset + killed_count * killed.itemsize])
+        offset += killed_count * killed.itemsize
+        collected = array("q")
+        collected.frombytes(data[offset:offset + collected_count * collected.itemsize])
+        offset += collected_count * collected.itemsize
+        self.killed_ids = set(killed)
+        self.collected_ids = set(collected)
+
+        chunks = array("i")
+        chunks.frombytes(data[offset:offset + chunk_count * chunks.itemsize])
+        offset += chunk_count * chunks.itemsize
+        if self.streaming:
+            for col in list(self.loaded_chunks):
+                if col not in chunks:
+                    self.unload_chunk(col)
+            for col in chunks:
+                if col not in self.loaded_chunks:
+                    self.load_chunk(col)
+        self.respawn_keys()
+
+        # The platforms are the snapshot's again, and nav nodes are numbered the
+        # same for the same platforms, so a rebuilt graph matches the saved nodes
+        if self.nav is not None and self.nav_version != self.platforms_version:
+            self.nav_graph()
+        # Loading chunks may have added enemies; the snapshot's rows and sleepers replace them all
+        self.enemies.unpack(data, enemies_at, enemy_count)
+        self.sleeper_count = 0
+        self.add_sleepers(np.frombuffer(data, SLEEPER, sleeper_count, offset))
+        if self.nav is not None:
+            self.nav.set_goal(None if goal < 0 else goal)
+
+    def respawn_keys(self):
+        # Keys that are not collected, from the level data (per loaded chunk when streaming)
+        self.collectibles.empty()
+        self.collectible_index.clear()
+        collected = self.collected_ids
+        if self.streaming:
+            for col, (platform_ids, spawn_ids, _) in self.loaded_chunks.items():
+                _, _, keys = self.level.read_chunk(col)
+                collectibles = [self.add_collectible(key_id, x, y) for key_id, x, y in keys if key_id not in collected]
+                self.loaded_chunks[col] = (platform_ids, spawn_ids, collectibles)
+        else:
+            for key_id, (x, y) in enumerate(self.level.keys):
+                if key_id not in collected:
+                    self.add_collectible(key_id, x, y)
+
+    def close(self):
+        # Releases a streamed level's file and mapping; the world can't step after this
+        if self.streaming:
+            self.level.close()
+
+    @property
+    def done(self):
+        return self.game_over or self.victory
+
+    def checksum(self):
+        # CRC of the gameplay state, used to check that replays stay in sync
+        player = self.player
+        crc = zlib.crc32(PLAYER_STATE.pack(
+            self.tick, player.rect.x, player.rect.y, player.vel_y, player.health, player.direction,
+            player.jump_count, player.invincible_timer, player.knockback_timer, player.death_timer,
+            player.is_attacking, player.dead, self.collected_count, self.screen_shake, len(self.particles),
+        ))
+        enemies = self.enemies
+        n = len(enemies)
+        for array in (enemies.x, enemies.y, enemies.direction):
+            crc = zlib.crc32(array[:n].tobytes(), crc)
+        return crc
+
+    def step(self, inputs=NO_INPUT):
+        events = self.events
+        events.clear()
+        if self.done:
+            return
+        self.tick += 1
+        player = self.player
+        profiler = self.profiler
+        # Positions at the start of the tick, for render interpolation
+        self.prev_player = player.rect.topleft
+        self.enemies.save_previous()
+        if self.streaming:
+            self.update_stream()
+
+        # Update
+        jump_count = player.jump_count
+        was_attacking = player.is_attacking
+        player.update(self.platform_index, inputs)
+        if player.jump_count > jump_count:
+            events.append("jump")
+        if player.is_attacking and not was_attacking:
+            events.append("attack")
+        if profiler is not None:
+            profiler.mark("physics")
+        if player.dead and player.death_timer <= 0:
+            self.game_over = True
+            return
+        if self.active_margin is not None and self.tick % ACTIVATION_INTERVAL == 0:
+            self.update_activation()
+        self.update_enemies()
+        if profiler is not None:
+            profiler.mark("enemies")
+
+        for collectible in self.collectible_index.query(player.rect):
+            if player.rect.colliderect(collectible.rect):
+                self.collectible_index.remove(collectible)
+                collectible.kill()
+                self.collected_ids.add(collectible.key_id)
+                self.collected_count += 1
+                events.append("key")
+
+        self.update_combat()
+
+        # Reaching the victory gate with every collectible ends the run
+        if player.rect.colliderect(self.victory_block.rect) and self.collected_count == self.total_keys:
+            self.victory = True
+            events.append("gate")
+
+        if self.screen_shake > 0:
+            self.screen_shake -= 1
+        if self.red_flash_alpha > 0:
+            self.red_flash_alpha = max(0, self.red_flash_alpha - 6)
+        if profiler is not None:
+            profiler.mark("collision")
+
+        self.particles.update()
+        if profiler is not None:
+            profiler.mark("particles")
+
+    def nav_graph(self):
+        if self.nav_version != self.platforms_version:
+            self.nav_version = self.platforms_version
+            player = self.player
+            self.nav = NavGraph([p.rect for p in self.platforms], player.speed, player.jump_power, GRAVITY,
+                                self.level_height)
+            # Node numbers changed; chasers find their platform again as they land
+            self.enemies.node[:len(self.enemies)] = -1
+        return self.nav
+
+    def update_enemies(self):
+        enemies = self.enemies
+        if self.chase and len(enemies):
+            nav = self.nav_graph()
+            rect = self.player.rect
+            # The cached paths only go stale when the player reaches another platform
+            goal = nav.node_at(rect.left, rect.right, rect.bottom)
+            if goal is not None:
+                nav.set_goal(goal)
+            enemies.aggro(nav, rect)
+            enemies.chase(nav, rect.centerx, self.level_width)
+        enemies.update()
+
+    def update_combat(self):
+        player = self.player
+        enemies = self.enemies
+        if player.is_attacking:
+            # The swing reaches out on the side the player faces
+            attack_range = self.attack_range
+            if player.direction == -1:
+                attack_range.topleft = (player.rect.left - attack_range.width, player.rect.centery - attack_range.height // 2)
+            else:
+                attack_range.topleft = (player.rect.right, player.rect.centery - attack_range.height // 2)
+            hits = enemies.collide(self.attack_mask, attack_range.x, attack_range.y, attack_range)
+            if hits.size:
+                self.particles.emit(*enemies.centers(hits), 12)
+                self.killed_ids.update(enemies.spawn_id[hits].tolist())
+                enemies.remove(hits)
+                self.events.append("hit")
+            # Attacking makes the player immune to contact damage
+            return
+
+        if player.invincible:
+            return
+        # The first enemy touching the player's opaque pixels lands the hit; the player is invincible after it
+        rect = player.rect
+        box = assets.hitboxes[player.frame_id].move(rect.topleft)
+        hits = enemies.collide(assets.masks[player.frame_id], rect.x, rect.y, box)
+        if hits.size and player.take_damage(int(enemies.centers(hits[0])[0])):
+            self.screen_shake = 14
+            self.red_flash_alpha = RED_FLASH_MAX
+            self.events.append("hit")
+
+
+# ---------------- ROLLBACK ----------------
+class Rollback:
+    # Steps a world while keeping a snapshot and the inputs of each of the last
+    # `frames` ticks, so it can rewind and re-simulate them, e.g. with a
+    # corrected input for a tick that has already run
+    def __init__(self, world, frames=ROLLBACK_FRAMES):
+        self.world = world
+        self.history = deque(maxlen=frames)
+
+    def __len__(self):
+        return len(self.history)
+
+    def step(self, inputs=NO_INPUT):
+        self.history.append((self.world.snapshot(), inputs))
+        self.world.step(inputs)
+
+    def rewind(self, ticks):
+        # Restores the state from `ticks` steps ago and returns the inputs of
+        # the steps that were undone, oldest first
+        ticks = min(ticks, len(self.history))
+        if ticks <= 0:
+            return []
+        undone = [self.history.pop() for _ in range(ticks)]
+        undone.reverse()
+        self.world.restore(undone[0][0])
+        return [inputs for _, inputs in undone]
+
+    def resimulate(self, ticks, corrected=None):
+        # Rewinds `ticks` steps and runs them again; corrected maps a position
+        # in that window (0 = oldest) to the input it should have had
+        inputs = self.rewind(ticks)
+        for i, tick_inputs in enumerate(inputs):
+            if corrected is not None and i in corrected:
+                tick_inputs = corrected[i]
+            self.step(tick_inputs)
+
+
+# ---------------- HEADLESS RUN ----------------
+def run_headless(ticks, policy=None, world=None):
+    # Steps a world as fast as possible; policy(world) -> Inputs picks each tick's input
+    world = world if world is not None else World()
+    for _ in range(ticks):
+        world.step(policy(world) if policy is not None else NO_INPUT)
+        if world.done:
+            world.reset()
+    return world
+
+
+if __name__ == "__main__":
+    # Soak test: python world.py [ticks] [level]
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 60000
+    level = load_level(sys.argv[2]) if len(sys.argv) > 2 else None
+    rng = random.Random(0)
+    world = World(seed=1, level=level)
+    start = time.perf_counter()
+    run_headless(ticks, lambda w: Inputs(rng.random() < 0.3, rng.random() < 0.6, rng.random() < 0.05, rng.random() < 0.1), world)
+    elapsed = time.perf_counter() - start
+    world.close()
+    print(f"{ticks} ticks in {elapsed:.3f}s ({ticks / elapsed:.0f} ticks/s)")
@@ -0,0 +1,11 @@
+import os
+import sys
+
+# The game modules live flat in src/ and the tests run without a window
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+pygame.init()
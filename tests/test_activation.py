@@ -0,0 +1,56 @@
+import pytest
+
+from level import Level
+from world import HEIGHT, WIDTH, Inputs, World, get_camera_offset
+
+
+def visible_enemies(world):
+    camera_x, _ = get_camera_offset(world.player)
+    enemies = world.enemies
+    n = len(enemies)
+    on_screen = (enemies.x[:n] + enemies.width > camera_x) & (enemies.x[:n] < camera_x + WIDTH)
+    return sorted(zip(enemies.spawn_id[:n][on_screen].tolist(), enemies.x[:n][on_screen].tolist()))
+
+
+def activation_mismatch(level, hit_tick, ticks=300):
+    # Walks left through level with and without activation, knocked back at
+    # hit_tick so the camera moves as fast as it can; returns the first tick
+    # the two worlds show different enemies, or None
+    worlds = (World(seed=0, level=level), World(seed=0, level=level, active_margin=None))
+    walk_left = Inputs(left=True)
+    for tick in range(ticks):
+        for world in worlds:
+            if tick == hit_tick:
+                world.player.take_damage(10 ** 6)
+            world.step(walk_left)
+        if visible_enemies(worlds[0]) != visible_enemies(worlds[1]):
+            return tick
+    return None
+
+
+# One slow patroller with the shortest span there is, crossed by the camera
+# from every start and knockback timing in a range
+@pytest.mark.parametrize("start_x", range(2700, 3100, 10))
+def test_knockback_never_shows_a_sleeper(start_x):
+    level = Level(6000, HEIGHT, (start_x, 350), (5800, 360), [(0, 440, 6000, 40)], [(2001, 360, 0, 1)], [])
+    mismatches = {hit_tick: activation_mismatch(level, hit_tick) for hit_tick in range(8, 28)}
+    assert {hit: tick for hit, tick in mismatches.items() if tick is not None} == {}
+
+
+def test_sleepers_wake_where_ticking_would_have_left_them():
+    # Patrollers of every speed the sleep path takes, on a level wide enough
+    # that most of them sleep while the player walks across and back. They
+    # patrol above the player's head so nothing interrupts the walk.
+    enemies = [(x, 50, width, speed) for x, (width, speed) in zip(
+        range(600, 9000, 350), [(w, s) for w in (0, 37, 80, 150.5) for s in (1, 2, 2.4, 3, 4.7, 1.5)])]
+    level = Level(10000, HEIGHT, (100, 350), (9800, 360), [(0, 440, 10000, 40)], enemies, [])
+    worlds = (World(seed=0, level=level), World(seed=0, level=level, active_margin=None))
+    slept = 0
+    for tick in range(2000):
+        inputs = Inputs(right=tick < 1000, left=tick >= 1000)
+        for world in worlds:
+            world.step(inputs)
+        slept = max(slept, worlds[0].sleeper_count)
+        assert visible_enemies(worlds[0]) == visible_enemies(worlds[1]), tick
+    assert not worlds[0].done
+    assert slept > 0
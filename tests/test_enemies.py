@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from enemies import SMALL_BATCH, EnemyBatch, patrol_after
+from world import FPS
+
+PATROLS = [(width, speed) for width in (0, 1, 37, 80, 100.5, 150) for speed in (1, 2, 2.4, 3, 1.3, 4.7)]
+
+
+def batch_of(count):
+    batch = EnemyBatch(FPS)
+    for i in range(count):
+        width, speed = PATROLS[i % len(PATROLS)]
+        batch.add(i, 100 + 7 * i, 300, width, speed)
+    return batch
+
+
+# SMALL_BATCH rows go through the plain-loop update, more through NumPy
+@pytest.mark.parametrize("count", [SMALL_BATCH, len(PATROLS)])
+def test_patrol_after_matches_stepping(count):
+    batch = batch_of(count)
+    n = len(batch)
+    start_x = batch.start_x[:n].copy()
+    width = batch.patrol_width[:n].copy()
+    step = np.rint(batch.speed[:n])
+    states = []
+    for _ in range(400):
+        states.append((batch.x[:n].copy(), batch.direction[:n].copy()))
+        batch.update()
+    states.append((batch.x[:n].copy(), batch.direction[:n].copy()))
+
+    for since in (0, 1, 13, 150):
+        x, direction = states[since]
+        for ticks in (0, 1, 2, 5, 61, 400 - since):
+            expected_x, expected_direction = states[since + ticks]
+            got_x, got_direction = patrol_after(x, direction, start_x, width, step, ticks)
+            assert got_x.tolist() == expected_x.tolist()
+            assert got_direction.tolist() == expected_direction.tolist()
+
+
+def test_small_batch_path_matches_vectorized():
+    small = batch_of(SMALL_BATCH)
+    # The same rows plus one row that is falling force the vectorized path
+    large = batch_of(SMALL_BATCH + 1)
+    large.dead_anim[SMALL_BATCH] = 10 ** 6
+    for _ in range(300):
+        small.update()
+        large.update()
+        for name in ("x", "direction", "anim", "frame_id"):
+            assert getattr(small, name)[:SMALL_BATCH].tolist() == getattr(large, name)[:SMALL_BATCH].tolist()
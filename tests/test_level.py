@@ -0,0 +1,115 @@
+import json
+import struct
+
+import pytest
+
+from level import DEFAULT_LEVEL, Level, LevelError, LevelStream, load_level
+from world import Inputs, World
+
+
+def write_level(tmp_path, **changes):
+    with open(DEFAULT_LEVEL) as f:
+        data = json.load(f)
+    data.update(changes)
+    path = str(tmp_path / "level.json")
+    with open(path, "w") as f:
+        json.dump(data, f)
+    return path
+
+
+@pytest.mark.parametrize("chunk_width", [100, 200, 640, 4000])
+def test_compiled_level_streams_back_every_record(tmp_path, chunk_width):
+    level = Level.from_json(DEFAULT_LEVEL)
+    path = str(tmp_path / "level.kdl")
+    level.compile(path, chunk_width)
+    with load_level(path) as stream:
+        assert isinstance(stream, LevelStream)
+        assert (stream.width, stream.height, stream.player_start, stream.victory, stream.key_count, stream.chase) == (
+            level.width, level.height, level.player_start, level.victory, level.key_count, level.chase)
+        platforms = {}
+        enemies = {}
+        keys = {}
+        for col in range(stream.chunk_count):
+            chunk_platforms, chunk_enemies, chunk_keys = stream.read_chunk(col)
+            for platform_id, *rect in chunk_platforms:
+                platforms[platform_id] = tuple(rect)
+            for spawn_id, *enemy in chunk_enemies:
+                assert spawn_id not in enemies
+                enemies[spawn_id] = tuple(enemy)
+            for key_id, *key in chunk_keys:
+                assert key_id not in keys
+                keys[key_id] = tuple(key)
+        assert [platforms[i] for i in range(len(platforms))] == level.platforms
+        assert [enemies[i] for i in range(len(enemies))] == level.enemies
+        assert [keys[i] for i in range(len(keys))] == level.keys
+
+
+def test_fractional_patrol_width_and_speed_survive_compiling(tmp_path):
+    level = Level(1000, 480, (100, 300), (900, 360), [(0, 440, 1000, 40)], [(300, 360, 80.5, 1.25)], [])
+    path = str(tmp_path / "level.kdl")
+    level.compile(path)
+    with load_level(path) as stream:
+        assert stream.read_chunk(0)[1] == [(0, 300, 360, 80.5, 1.25)]
+
+
+def test_streamed_world_matches_the_json_world(tmp_path):
+    # With the whole level in one chunk nothing is ever unloaded, so the two
+    # worlds stay identical tick for tick
+    path = str(tmp_path / "level.kdl")
+    Level.from_json(DEFAULT_LEVEL).compile(path, 4000)
+    worlds = (World(seed=7), World(seed=7, level=load_level(path)))
+    for tick in range(2000):
+        inputs = Inputs(right=tick % 300 < 200, left=tick % 300 >= 200, jump=tick % 45 == 0, attack=tick % 20 == 0)
+        for world in worlds:
+            if world.done:
+                world.reset()
+            world.step(inputs)
+        assert worlds[0].checksum() == worlds[1].checksum(), tick
+    worlds[1].close()
+
+
+def test_other_versions_are_rejected(tmp_path):
+    path = str(tmp_path / "level.kdl")
+    Level.from_json(DEFAULT_LEVEL).compile(path)
+    # The version follows the 4-byte magic
+    with open(path, "r+b") as f:
+        f.seek(4)
+        f.write(struct.pack("<H", 1))
+    with pytest.raises(LevelError):
+        load_level(path)
+
+
+@pytest.mark.parametrize("size", [0, 10])
+def test_truncated_files_are_rejected(tmp_path, size):
+    path = str(tmp_path / "level.kdl")
+    with open(path, "wb") as f:
+        f.write(b"KDLV" + bytes(size))
+    with pytest.raises(LevelError):
+        load_level(path)
+
+
+def test_short_enemy_entries_get_the_old_defaults(tmp_path):
+    level = Level.from_json(write_level(tmp_path, enemies=[[300, 360], [500, 360, 80.5, 1.5]]))
+    assert level.enemies == [(300, 360, 100, 2), (500, 360, 80.5, 1.5)]
+    World(seed=0, level=level)
+
+
+@pytest.mark.parametrize("changes", [
+    {"platforms": [[0, 440.5, 100, 40]]},
+    {"platforms": [[0, 440, 100]]},
+    {"player_start": [100.5, 300]},
+    {"victory": [10, "a"]},
+    {"width": 3000.5},
+    {"enemies": [[300]]},
+    {"enemies": [[300, 360, "wide", 2]]},
+    {"keys": [[True, 3]]},
+])
+def test_bad_records_raise_level_error(tmp_path, changes):
+    with pytest.raises(LevelError):
+        Level.from_json(write_level(tmp_path, **changes))
+
+
+def test_whole_floats_load_as_ints(tmp_path):
+    level = Level.from_json(write_level(tmp_path, platforms=[[0.0, 440, 100, 40]]))
+    assert level.platforms == [(0, 440, 100, 40)]
+    assert all(type(v) is int for v in level.platforms[0])
@@ -0,0 +1,28 @@
+import pytest
+
+from level import DEFAULT_LEVEL, Level
+from replay import Replay, play, record_random
+
+
+@pytest.mark.parametrize("chunk_width", [None, 200, 640])
+def test_recorded_replay_plays_back_in_sync(tmp_path, chunk_width):
+    level_path = DEFAULT_LEVEL
+    if chunk_width is not None:
+        level_path = str(tmp_path / "level1.kdl")
+        Level.from_json(DEFAULT_LEVEL).compile(level_path, chunk_width)
+    path = str(tmp_path / "run.kdr")
+    record_random(4000, 5, level_path).save(path)
+    replay = Replay.load(path)
+    assert len(replay) == 4000
+    world, mismatch = play(replay)
+    world.close()
+    assert mismatch is None
+
+
+def test_tampered_input_desyncs(tmp_path):
+    replay = record_random(1000, 5)
+    inputs = bytearray(replay.inputs)
+    inputs[300] ^= 0x02
+    replay.inputs = inputs
+    _, mismatch = play(replay)
+    assert mismatch is not None and mismatch >= 300
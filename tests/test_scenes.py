@@ -0,0 +1,30 @@
+import pygame
+
+from scenes import Scene
+
+
+class RecordingDisplay:
+    # Stands in for a display and keeps the fade of every frame shown.
+    # Presenting takes a while, like a real one, so a tween can finish
+    # between being sampled and the frame reaching the screen.
+    def __init__(self):
+        self.surface = pygame.Surface((80, 60))
+        self.fades = []
+
+    def show(self, rects, fade=None):
+        self.fades.append(fade)
+        pygame.time.wait(7)
+
+
+def test_fade_presents_its_end_before_finishing():
+    # Frames come every 1/FPS s, so a spread of durations lands the tween's
+    # end at every point between a sample and its frame being presented
+    for duration, end in zip(range(40, 64, 3), (255, 0) * 4):
+        display = RecordingDisplay()
+        scene = Scene(display, pygame.Surface((80, 60)))
+        finished_at = []
+        scene.start_fade((255, 255, 255), 255 - end, end, duration,
+                         on_done=lambda: (finished_at.append(len(display.fades)), scene.stop()))
+        scene.run()
+        assert finished_at == [len(display.fades)]
+        assert display.fades[-1] == ((255, 255, 255), end), duration
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from level import load_level
+from world import Inputs, Rollback, World
+
+
+@pytest.fixture(scope="module")
+def streamed_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("levels") / "level1.kdl")
+    load_level().compile(path, 200)
+    return path
+
+
+def random_inputs(rng):
+    return Inputs(rng.random() < 0.3, rng.random() < 0.6, rng.random() < 0.05, rng.random() < 0.1)
+
+
+def run(world, rng, ticks):
+    checksums = []
+    for _ in range(ticks):
+        if world.done:
+            world.reset()
+        world.step(random_inputs(rng))
+        checksums.append(world.checksum())
+    return checksums
+
+
+@pytest.fixture(params=["json", "streamed"])
+def make_world(request, streamed_path):
+    # World factory for the JSON level and a streamed copy of it
+    worlds = []
+
+    def make(**kwargs):
+        level = load_level(streamed_path) if request.param == "streamed" else None
+        worlds.append(World(seed=3, level=level, **kwargs))
+        return worlds[-1]
+
+    yield make
+    for world in worlds:
+        world.close()
+
+
+@pytest.mark.parametrize("chase", [False, True])
+def test_identical_runs_give_identical_snapshots(make_world, chase):
+    worlds = [make_world(chase=chase) for _ in range(2)]
+    rngs = [random.Random(1), random.Random(1)]
+    for _ in range(20):
+        for world, rng in zip(worlds, rngs):
+            run(world, rng, 100)
+        assert worlds[0].snapshot() == worlds[1].snapshot()
+
+
+@pytest.mark.parametrize("chase", [False, True])
+def test_restore_replays_the_same_ticks(make_world, chase):
+    world = make_world(chase=chase)
+    rng = random.Random(1)
+    for _ in range(6):
+        run(world, rng, 350)
+        saved = world.snapshot()
+        state = rng.getstate()
+        expected = run(world, rng, 200)
+        world.restore(saved)
+        rng.setstate(state)
+        assert world.snapshot() == saved
+        assert run(world, rng, 200) == expected
+
+
+def test_reset_matches_a_fresh_world(make_world):
+    world = make_world()
+    run(world, random.Random(1), 1500)
+    world.reset()
+    assert world.snapshot() == make_world().snapshot()
+
+
+def test_rollback_resimulates_exactly():
+    world = World(seed=3)
+    rollback = Rollback(world)
+    rng = random.Random(2)
+    for _ in range(300):
+        rollback.step(random_inputs(rng))
+    expected = world.snapshot()
+    rollback.resimulate(60)
+    assert world.snapshot() == expected
+    rollback.resimulate(60, {i: Inputs() for i in range(60)})
+    assert world.snapshot() != expected
+    assert world.tick == 300